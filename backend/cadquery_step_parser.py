@@ -7,20 +7,44 @@ More stable in headless environments, avoids FreeCAD segfault issues.
 """
 
 import json
-import uuid
 import math
+import random
+import secrets
+import string
+import time
 import logging
-from datetime import datetime, timezone
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
 import os
 import sys
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Shared (never mutated) meta value marking a serialized Date field
+DATE_META = ("Date",)
+
+# Characters used for generated IDs
+ID_ALPHABET = string.ascii_letters + string.digits
+
+# Last formatted UTC timestamp, refreshed when the second changes
+_last_timestamp = [0, ""]
+
+
+def _iso_now() -> str:
+    """Current UTC time as an ISO-8601 string with zeroed milliseconds"""
+    second = int(time.time())
+    if second != _last_timestamp[0]:
+        _last_timestamp[0] = second
+        _last_timestamp[1] = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(second))
+    return _last_timestamp[1]
+
 try:
     import cadquery as cq
     from cadquery import importers
+    from OCP.STEPControl import STEPControl_Reader
+    from OCP.Interface import Interface_Static
+    from OCP.IFSelect import IFSelect_RetDone
     logger.info("[CADQuery] Successfully imported CADQuery")
 except ImportError as e:
     logger.error(f"[CADQuery] Import failed: {e}")
@@ -34,37 +58,40 @@ class CADQueryStepParser:
     def __init__(self):
         logger.info("[CADQuery Parser] Initialized")
     
-    def parse_step_content(self, step_file_path: str) -> Dict[str, Any]:
-        """Parse STEP file using CADQuery"""
+    def parse_step_content(self, step_file_path: str, fast: bool = False) -> Dict[str, Any]:
+        """Parse STEP file using CADQuery
+        
+        With fast=True the file is read as flat solids only, skipping the STEP
+        product/assembly structure that the quote never uses.
+        """
         
         try:
             logger.info(f"[CADQuery Parser] Step 1: Importing STEP file from {step_file_path}")
             logger.info(f"[CADQuery Parser] Step 1.1: File exists: {os.path.exists(step_file_path)}")
             logger.info(f"[CADQuery Parser] Step 1.2: File size: {os.path.getsize(step_file_path) if os.path.exists(step_file_path) else 'N/A'} bytes")
             
-            # Import STEP file using CADQuery
-            logger.info("[CADQuery Parser] Step 2: Loading STEP file with CADQuery...")
-            result = importers.importStep(step_file_path)
-            logger.info("[CADQuery Parser] Step 3: ✅ STEP file imported successfully")
-            
-            # Get all solids from the imported assembly
-            if isinstance(result, cq.Assembly):
-                logger.info("[CADQuery Parser] Step 4: Processing assembly")
-                solids = self._extract_solids_from_assembly(result)
-            elif isinstance(result, cq.Workplane):
-                logger.info("[CADQuery Parser] Step 4: Processing workplane")
-                solids = result.solids().vals() if result.solids().size() > 0 else []
+            if fast:
+                logger.info("[CADQuery Parser] Step 2: Loading STEP file solids (fast path)...")
+                solids = self._import_step_solids(step_file_path)
+                logger.info("[CADQuery Parser] Step 3: ✅ STEP file imported successfully")
             else:
-                logger.info("[CADQuery Parser] Step 4: Processing direct solid")
-                solids = [result] if hasattr(result, 'BoundingBox') else []
+                # Import STEP file using CADQuery
+                logger.info("[CADQuery Parser] Step 2: Loading STEP file with CADQuery...")
+                result = importers.importStep(step_file_path)
+                logger.info("[CADQuery Parser] Step 3: ✅ STEP file imported successfully")
+                solids = self._solids_from_import(result)
             
             logger.info(f"[CADQuery Parser] Step 5: Found {len(solids)} solid(s)")
             
+            # Every createdAt/number in one quote shares the same timestamp and date prefix
+            created_at = _iso_now()
+            date_prefix = self._generate_date_prefix()
+            
             parts_data = []
             for i, solid in enumerate(solids):
                 try:
                     logger.info(f"[CADQuery Parser] Step 6.{i+1}: Processing solid {i+1}/{len(solids)}")
-                    part_data = self._process_solid(solid, i)
+                    part_data = self._process_solid(solid, i, created_at, date_prefix)
                     parts_data.append(part_data)
                     logger.info(f"[CADQuery Parser] Step 6.{i+1}: ✅ Solid {i+1} processed")
                 except Exception as solid_error:
@@ -72,7 +99,7 @@ class CADQueryStepParser:
                     raise
             
             logger.info("[CADQuery Parser] Step 7: Creating quote structure")
-            result = self._create_quote_structure(parts_data, step_file_path)
+            result = self._create_quote_structure(parts_data, step_file_path, created_at, date_prefix)
             logger.info("[CADQuery Parser] Step 8: ✅ Parsing completed successfully")
             
             return result
@@ -83,6 +110,42 @@ class CADQueryStepParser:
             logger.error(f"[CADQuery Parser] Stack trace:\n{traceback.format_exc()}")
             raise
     
+    def _solids_from_import(self, result) -> List:
+        """Get all solids from a CADQuery import result"""
+        if isinstance(result, cq.Assembly):
+            logger.info("[CADQuery Parser] Step 4: Processing assembly")
+            return self._extract_solids_from_assembly(result)
+        elif isinstance(result, cq.Workplane):
+            logger.info("[CADQuery Parser] Step 4: Processing workplane")
+            return result.solids().vals() if result.solids().size() > 0 else []
+        else:
+            logger.info("[CADQuery Parser] Step 4: Processing direct solid")
+            return [result] if hasattr(result, 'BoundingBox') else []
+    
+    def _import_step_solids(self, step_file_path: str) -> List:
+        """Read only the solids of a STEP file, without product structure
+        
+        Turning read.step.product.mode off makes TransferRoots produce plain shapes
+        instead of mapping the product/assembly graph, which dominates read time on
+        large assemblies.
+        """
+        # The reader's constructor registers the STEP statics (STEPControl_Controller::Init),
+        # so it has to exist before the mode can be read or set
+        reader = STEPControl_Reader()
+        previous_mode = Interface_Static.CVal_s("read.step.product.mode")
+        if not Interface_Static.SetCVal_s("read.step.product.mode", "OFF"):
+            raise RuntimeError("read.step.product.mode could not be set; STEP statics not registered")
+        try:
+            if reader.ReadFile(step_file_path) != IFSelect_RetDone:
+                raise ValueError(f"STEP file could not be loaded: {step_file_path}")
+            reader.TransferRoots()
+            shape = cq.Shape.cast(reader.OneShape())
+        finally:
+            Interface_Static.SetCVal_s("read.step.product.mode", previous_mode)
+        
+        logger.info("[CADQuery Parser] Step 4: Processing flat solids")
+        return shape.Solids()
+    
     def _extract_solids_from_assembly(self, assembly: cq.Assembly) -> List:
         """Extract all solids from a CADQuery assembly"""
         solids = []
@@ -94,7 +157,7 @@ class CADQueryStepParser:
         
         return solids
     
-    def _process_solid(self, solid, index: int) -> Dict[str, Any]:
+    def _process_solid(self, solid, index: int, created_at: str, date_prefix: str) -> Dict[str, Any]:
         """Process a single solid and extract geometry data"""
         
         # Get bounding box
@@ -125,11 +188,11 @@ class CADQueryStepParser:
         
         # Create body data
         body_data = self._create_body_data(
-            volume, surface_area, length, width, height, holes, index
+            volume, surface_area, length, width, height, holes, index, created_at
         )
         
         # Create part data
-        part_data = self._create_part_data(body_data, index)
+        part_data = self._create_part_data(body_data, index, created_at, date_prefix)
         
         return part_data
     
@@ -173,7 +236,7 @@ class CADQueryStepParser:
     
     def _create_body_data(self, volume: float, surface_area: float,
                          length: float, width: float, height: float,
-                         holes: List[Dict], body_index: int) -> Dict[str, Any]:
+                         holes: List[Dict], body_index: int, created_at: str) -> Dict[str, Any]:
         """Create body data structure"""
         
         # Calculate cut length (perimeter + holes)
@@ -189,7 +252,7 @@ class CADQueryStepParser:
         
         return {
             "id": f"body_{self._generate_id()}",
-            "createdAt": datetime.now(timezone.utc).isoformat().replace('+00:00', '.000Z'),
+            "createdAt": created_at,
             "fileId": f"file_{self._generate_id()}",
             "bodyIndex": body_index,
             "thickness": str(height),
@@ -217,7 +280,8 @@ class CADQueryStepParser:
             "subType": "flat"
         }
     
-    def _create_part_data(self, body_data: Dict[str, Any], part_index: int) -> Dict[str, Any]:
+    def _create_part_data(self, body_data: Dict[str, Any], part_index: int,
+                          created_at: str, date_prefix: str) -> Dict[str, Any]:
         """Create part data structure"""
         assembly_id = f"assm_{self._generate_id()}"
         
@@ -227,8 +291,8 @@ class CADQueryStepParser:
             "deleted": False,
             "customPrice": None,
             "customNotes": None,
-            "createdAt": datetime.now(timezone.utc).isoformat().replace('+00:00', '.000Z'),
-            "number": f"{self._generate_date_prefix()}-{self._generate_part_number()}",
+            "createdAt": created_at,
+            "number": f"{date_prefix}-{self._generate_part_number()}",
             "name": f"Part {part_index + 1}",
             "bodyId": body_data["id"],
             "quantity": 1,
@@ -241,12 +305,15 @@ class CADQueryStepParser:
             "body": body_data
         }
     
-    def _create_quote_structure(self, parts_data: List[Dict], step_file_path: str) -> List[Dict[str, Any]]:
+    def _create_quote_structure(self, parts_data: List[Dict], step_file_path: str,
+                                created_at: str, date_prefix: str) -> List[Dict[str, Any]]:
         """Create the complete quote structure"""
         quote_id = f"qte_{self._generate_id()}"
         assembly_id = f"assm_{self._generate_id()}"
         file_id = f"file_{self._generate_id()}"
         
+        file_name = os.path.basename(step_file_path)
+        
         # Update assembly IDs in parts
         for part in parts_data:
             part["assemblyId"] = assembly_id
@@ -256,11 +323,11 @@ class CADQueryStepParser:
                 "data": {
                     "json": {
                         "id": quote_id,
-                        "createdAt": datetime.now(timezone.utc).isoformat().replace('+00:00', '.000Z'),
-                        "number": f"{self._generate_date_prefix()}-{self._generate_quote_number()}",
+                        "createdAt": created_at,
+                        "number": f"{date_prefix}-{self._generate_quote_number()}",
                         "userId": None,
                         "orgId": None,
-                        "guestId": str(uuid.uuid4()),
+                        "guestId": secrets.token_hex(16),
                         "deleted": False,
                         "shareId": None,
                         "sharedFrom": None,
@@ -272,18 +339,18 @@ class CADQueryStepParser:
                         "needsLiftGate": None,
                         "assemblies": [{
                             "id": assembly_id,
-                            "createdAt": datetime.now(timezone.utc).isoformat().replace('+00:00', '.000Z'),
+                            "createdAt": created_at,
                             "quoteId": quote_id,
-                            "number": f"{self._generate_date_prefix()}-{self._generate_assembly_number()}",
+                            "number": f"{date_prefix}-{self._generate_assembly_number()}",
                             "deleted": False,
-                            "name": os.path.basename(step_file_path),
+                            "name": file_name,
                             "fileId": file_id,
                             "parts": parts_data,
                             "file": {
                                 "id": file_id,
-                                "createdAt": datetime.now(timezone.utc).isoformat().replace('+00:00', '.000Z'),
+                                "createdAt": created_at,
                                 "parsedVersion": 2,
-                                "fileName": os.path.basename(step_file_path),
+                                "fileName": file_name,
                                 "fileType": "",
                                 "status": "success"
                             }
@@ -305,14 +372,15 @@ class CADQueryStepParser:
         
         return [quote_data]
     
-    def parse_step_file(self, step_file_path: str, output_file_path: str = None) -> List[Dict[str, Any]]:
+    def parse_step_file(self, step_file_path: str, output_file_path: str = None,
+                        fast: bool = False) -> List[Dict[str, Any]]:
         """Main parsing function using CADQuery"""
         
         if not os.path.exists(step_file_path):
             raise FileNotFoundError(f"STEP file not found: {step_file_path}")
         
         logger.info("Using CADQuery parser...")
-        result = self.parse_step_content(step_file_path)
+        result = self.parse_step_content(step_file_path, fast=fast)
         
         # Save to file if specified
         if output_file_path:
@@ -324,10 +392,7 @@ class CADQueryStepParser:
     
     def _generate_id(self) -> str:
         """Generate a random ID"""
-        import random
-        import string
-        chars = string.ascii_letters + string.digits
-        return ''.join(random.choices(chars, k=22))
+        return ''.join(random.choices(ID_ALPHABET, k=22))
     
     def _generate_date_prefix(self) -> str:
         """Generate date prefix in DD-MM format"""
@@ -336,50 +401,46 @@ class CADQueryStepParser:
     
     def _generate_quote_number(self) -> str:
         """Generate quote number"""
-        import random
         return f"{random.randint(1000, 9999)}"
     
     def _generate_part_number(self) -> str:
         """Generate part number"""
-        import random
         return f"{random.randint(100, 999)}-{random.randint(100, 999)}"
     
     def _generate_assembly_number(self) -> str:
         """Generate assembly number"""
-        import random
         return f"{random.randint(100, 999)}-{random.randint(100, 999)}"
     
-    def _generate_meta_values(self, parts_data: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    def _generate_meta_values(self, parts_data: List[Dict[str, Any]]) -> Dict[str, Tuple[str, ...]]:
         """Generate meta values for date fields"""
-        meta = {
-            "createdAt": ["Date"],
-            "assemblies.0.createdAt": ["Date"],
-            "assemblies.0.file.createdAt": ["Date"]
-        }
-        
-        for i in range(len(parts_data)):
-            meta[f"assemblies.0.parts.{i}.createdAt"] = ["Date"]
-            meta[f"assemblies.0.parts.{i}.body.createdAt"] = ["Date"]
+        part_count = len(parts_data)
+        keys = ["createdAt", "assemblies.0.createdAt", "assemblies.0.file.createdAt"]
+        keys += [f"assemblies.0.parts.{i}.createdAt" for i in range(part_count)]
+        keys += [f"assemblies.0.parts.{i}.body.createdAt" for i in range(part_count)]
         
-        return meta
+        return dict.fromkeys(keys, DATE_META)
 
 
 def main():
     """Main function for standalone usage"""
-    if len(sys.argv) < 2:
-        logger.info("Usage: python cadquery_step_parser.py <step_file_path> [output_json_path]")
-        logger.info("Example: python cadquery_step_parser.py custom_parts.step quote_output.json")
+    # --fast reads flat solids only (see CADQueryStepParser._import_step_solids)
+    fast = "--fast" in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != "--fast"]
+    if not args:
+        logger.info("Usage: python cadquery_step_parser.py [--fast] <step_file_path> [output_json_path]")
+        logger.info("Example: python cadquery_step_parser.py --fast custom_parts.step quote_output.json")
         return 1
     
-    step_file_path = sys.argv[1]
-    output_file_path = sys.argv[2] if len(sys.argv) > 2 else None
+    step_file_path = args[0]
+    output_file_path = args[1] if len(args) > 1 else None
     
     try:
         parser = CADQueryStepParser()
-        result = parser.parse_step_file(step_file_path, output_file_path)
+        result = parser.parse_step_file(step_file_path, output_file_path, fast=fast)
         
         if not output_file_path:
-            logger.info(json.dumps(result, indent=2))
+            # Compact JSON in a single write; indenting large quotes dominates runtime
+            sys.stdout.write(json.dumps(result, separators=(',', ':')) + '\n')
         
     except Exception as e:
         logger.error(f"Error: {e}")
@@ -7,7 +7,7 @@ Final No Base Price Version Part Price Calculator
 - All rates are positive
 """
 
-import pandas as pd
+import csv
 import numpy as np
 import os
 
@@ -22,10 +22,32 @@ class FinalPriceCalculator:
             material_params_file = os.path.join(data_dir, 'final_material_parameters.csv')
             finish_params_file = os.path.join(data_dir, 'final_finish_parameters.csv')
         
-        self.material_params_df = pd.read_csv(material_params_file)
-        self.finish_params_df = pd.read_csv(finish_params_file)
-        print(f"Loaded pricing parameters for {len(self.material_params_df)} material-grade combinations")
-        print(f"Loaded pricing parameters for {len(self.finish_params_df)} finish types")
+        # Parameter tables are a handful of rows, index them by lookup key directly
+        self._material_params = {
+            (row['material_type'], row['material_grade']): {
+                'material_rate': float(row['material_rate']),
+                'cut_count_rate': float(row['cut_count_rate']),
+                'r2': float(row['r2']),
+                'mape': float(row['mape'])
+            }
+            for row in self._read_params(material_params_file)
+        }
+        self._finish_params = {
+            row['finish']: {
+                'surface_rate': float(row['surface_rate']),
+                'r2': float(row['r2']),
+                'mape': float(row['mape'])
+            }
+            for row in self._read_params(finish_params_file)
+        }
+        print(f"Loaded pricing parameters for {len(self._material_params)} material-grade combinations")
+        print(f"Loaded pricing parameters for {len(self._finish_params)} finish types")
+    
+    @staticmethod
+    def _read_params(params_file):
+        """Read a parameter CSV into a list of row dicts"""
+        with open(params_file, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
         
     def calculate_price(self, material_type, material_grade, finish, material_area, thickness, 
                        num_cuts, surface_area):
@@ -45,39 +67,12 @@ class FinalPriceCalculator:
         - Calculated price
         """
         # Find material-grade combination parameters
-        material_params = self.material_params_df[
-            (self.material_params_df['material_type'] == material_type) & 
-            (self.material_params_df['material_grade'] == material_grade)
-        ]
+        material_params = self._material_params.get((material_type, material_grade))
         
-        if material_params.empty:
+        if material_params is None:
             raise ValueError(f"Parameters not found for material type '{material_type}' and grade '{material_grade}' combination")
-            
-        material_params = material_params.iloc[0]
         
-        # Handle finish parameters (No Deburring is baseline with no additional cost)
-        if finish == 'No Deburring':
-            # No Deburring is the baseline - no additional finish cost
-            finish_params = {
-                'surface_rate': 0,
-                'r2': 1.0,
-                'mape': 0.0
-            }
-        else:
-            # Find finish parameters for other finishes
-            finish_params = self.finish_params_df[
-                self.finish_params_df['finish'] == finish
-            ]
-            
-            if finish_params.empty:
-                # Default to "Matte Black Powder Coat" if finish not found
-                finish_params = self.finish_params_df[
-                    self.finish_params_df['finish'] == 'Matte Black Powder Coat'
-                ]
-                if finish_params.empty:
-                    raise ValueError("Default finish 'Matte Black Powder Coat' not found in parameters")
-                
-            finish_params = finish_params.iloc[0]
+        finish_params = self._get_finish_params(finish)
         
         # Calculate price (no base price included)
         material_cost = material_params['material_rate'] * material_area * thickness
@@ -122,16 +117,79 @@ class FinalPriceCalculator:
             }
         }
     
+    def calculate_price_batch(self, parts_df):
+        """
+        Calculate prices for many parts at once
+        
+        Parameters:
+        - parts_df: DataFrame with columns material_type, material_grade, finish,
+          mat_use_sqin, material_thickness, num_cuts, surf_area_sqin
+          (the layout written by extract_pricing_data.py)
+        
+        Returns:
+        - NumPy array of prices, one per row
+        """
+        material_keys = list(zip(parts_df['material_type'], parts_df['material_grade']))
+        missing = set(material_keys) - self._material_params.keys()
+        if missing:
+            material_type, material_grade = next(iter(missing))
+            raise ValueError(f"Parameters not found for material type '{material_type}' and grade '{material_grade}' combination")
+        
+        finishes = np.asarray(parts_df['finish'], dtype=object)
+        surface_rates = {f: self._get_finish_params(f)['surface_rate'] for f in set(finishes)}
+        
+        material_rate = np.array([self._material_params[k]['material_rate'] for k in material_keys], dtype=float)
+        cut_count_rate = np.array([self._material_params[k]['cut_count_rate'] for k in material_keys], dtype=float)
+        surface_rate = np.array([surface_rates[f] for f in finishes], dtype=float)
+        
+        material_area = np.asarray(parts_df['mat_use_sqin'], dtype=float)
+        thickness = np.asarray(parts_df['material_thickness'], dtype=float)
+        num_cuts = np.asarray(parts_df['num_cuts'], dtype=float)
+        surface_area = np.asarray(parts_df['surf_area_sqin'], dtype=float)
+        
+        # Deburred is priced on material area, other finishes on surface area
+        effective_surface_area = np.where(finishes == 'Deburred', material_area, surface_area)
+        
+        return (material_rate * material_area * thickness
+                + cut_count_rate * num_cuts
+                + surface_rate * effective_surface_area)
+    
+    def _get_finish_params(self, finish):
+        """Get finish parameters, No Deburring is the zero-cost baseline"""
+        if finish == 'No Deburring':
+            # No Deburring is the baseline - no additional finish cost
+            return {
+                'surface_rate': 0,
+                'r2': 1.0,
+                'mape': 0.0
+            }
+        
+        finish_params = self._finish_params.get(finish)
+        if finish_params is None:
+            # Default to "Matte Black Powder Coat" if finish not found
+            finish_params = self._finish_params.get('Matte Black Powder Coat')
+            if finish_params is None:
+                raise ValueError("Default finish 'Matte Black Powder Coat' not found in parameters")
+        
+        return finish_params
+    
     def get_available_materials(self):
         """Get all available material-grade combinations"""
-        return self.material_params_df[['material_type', 'material_grade', 'r2', 'mape']].copy()
+        return [
+            {'material_type': material_type, 'material_grade': material_grade,
+             'r2': params['r2'], 'mape': params['mape']}
+            for (material_type, material_grade), params in self._material_params.items()
+        ]
     
     def get_available_finishes(self):
         """Get all available finish types"""
-        finishes = self.finish_params_df[['finish', 'r2', 'mape']].copy()
         # Add No Deburring as baseline finish
-        no_deburring = pd.DataFrame([['No Deburring', 1.0, 0.0]], columns=['finish', 'r2', 'mape'])
-        return pd.concat([no_deburring, finishes], ignore_index=True)
+        finishes = [{'finish': 'No Deburring', 'r2': 1.0, 'mape': 0.0}]
+        finishes.extend(
+            {'finish': finish, 'r2': params['r2'], 'mape': params['mape']}
+            for finish, params in self._finish_params.items()
+        )
+        return finishes
     
 
 def main():
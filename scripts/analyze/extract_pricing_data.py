@@ -6,134 +6,197 @@ Fixed version that correctly extracts pricing data
 
 import json
 import csv
+import gzip
 import os
-import glob
 from collections import defaultdict, Counter
+from itertools import chain, islice
 import statistics
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_pricing_data():
-    """Extract pricing data from all JSON files in the data directory"""
-    
-    data_dir = "/mnt/c/Users/kgdev/SwiftFab/data"
-    all_data = []
+# Per-part fields taken from the quote, in CSV column order
+PART_FIELDS = [
+    'part_name', 'part_number', 'quantity', 'material_type', 'material_grade',
+    'material_thickness', 'finish', 'cut_len_in', 'num_cuts', 'mat_use_sqin',
+    'sheet_area_sqin', 'surf_area_sqin', 'volume_in3', 'length_in', 'thickness',
+    'source_file'
+]
+
+# Below this many files a process pool costs more to start than it saves
+PARALLEL_MIN_FILES = 32
+
+def _process_one(json_file):
+    """Extract the priced part rows of one quote JSON (or JSON Lines) file as column lists"""
+    columns = defaultdict(list)
     
-    # Find all JSON files
-    json_files = glob.glob(os.path.join(data_dir, "**", "*.json"), recursive=True)
+    try:
+        # permute_all_materials.py --compress writes gzipped .json.gz (or .jsonl.gz) files
+        opener = gzip.open if json_file.endswith('.gz') else open
+        with opener(json_file, 'rt', encoding='utf-8') as f:
+            if json_file.endswith(('.jsonl', '.jsonl.gz')):
+                # permute_all_materials.py --aggregate: one combination per line,
+                # each named by the per-combination file it replaces
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        _extract_rows(record, record.get('filename') or os.path.basename(json_file), columns)
+            else:
+                _extract_rows(json.load(f), os.path.basename(json_file), columns)
+        
+    except Exception as e:
+        print(f"Error processing {json_file}: {e}")
     
-    print(f"Found {len(json_files)} JSON files to process...")
+    return columns
+
+def _extract_rows(data, source_file, columns):
+    """Append the priced part rows of one combination's quote data onto columns"""
+    # Extract combination info
+    combination_info = data.get('combination_info') or {}
+    material_type = combination_info.get('materialType', '')
+    material_grade = combination_info.get('materialGrade', '')
+    material_thickness = combination_info.get('materialThickness', '')
+    finish = combination_info.get('finish', '')
     
-    for json_file in json_files:
+    # Extract quote details
+    for quote_detail in data.get('quote_details', ()):
+        # Index the known response path directly; skip quotes without it
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Extract combination info
-            combination_info = data.get('combination_info', {})
-            material_type = combination_info.get('materialType', '')
-            material_grade = combination_info.get('materialGrade', '')
-            material_thickness = combination_info.get('materialThickness', '')
-            finish = combination_info.get('finish', '')
-            
-            # Extract quote details
-            quote_details = data.get('quote_details', [])
-            
-            for quote_detail in quote_details:
-                result = quote_detail.get('result', {})
-                quote_data = result.get('data', {}).get('json', {})
-                
-                # Extract assemblies and parts
-                assemblies = quote_data.get('assemblies', [])
+            quote_data = quote_detail['result']['data']['json']
+            assemblies = quote_data['assemblies']
+            pricing_parts = quote_data['pricing']['parts']
+        except (KeyError, TypeError):
+            continue
+        
+        # Create a mapping of part_id to its row of part fields
+        part_rows = {}
+        
+        for assembly in assemblies:
+            for part in assembly.get('parts', ()):
+                part_id = part.get('id', '')
                 
-                # Create a mapping of part_id to part data
-                part_data_map = {}
+                # Extract part basic info
+                part_name = part.get('name', '')
+                part_number = part.get('number', '')
+                quantity = part.get('quantity', 1)
                 
-                for assembly in assemblies:
-                    parts = assembly.get('parts', [])
-                    
-                    for part in parts:
-                        part_id = part.get('id', '')
-                        
-                        # Extract part basic info
-                        part_name = part.get('name', '')
-                        part_number = part.get('number', '')
-                        quantity = part.get('quantity', 1)
-                        
-                        # Extract part material properties
-                        part_material_type = part.get('materialType', material_type)
-                        part_material_grade = part.get('materialGrade', material_grade)
-                        part_material_thickness = part.get('materialThickness', material_thickness)
-                        part_finish = part.get('finish', finish)
-                        
-                        # Extract part dimensions and properties
-                        body = part.get('body', {})
-                        cut_len_in = body.get('cutLenIn', 0)
-                        num_cuts = body.get('numCuts', 0)
-                        mat_use_sqin = body.get('matUseSqin', 0)
-                        sheet_area_sqin = body.get('sheetAreaSqin', 0)
-                        surf_area_sqin = body.get('surfAreaSqin', 0)
-                        volume_in3 = body.get('volumeIn3', 0)
-                        length_in = body.get('lengthIn', 0)
-                        thickness = body.get('thickness', 0)
-                        
-                        # Store part data
-                        part_data_map[part_id] = {
-                            'part_name': part_name,
-                            'part_number': part_number,
-                            'quantity': quantity,
-                            'material_type': part_material_type,
-                            'material_grade': part_material_grade,
-                            'material_thickness': part_material_thickness,
-                            'finish': part_finish,
-                            'cut_len_in': cut_len_in,
-                            'num_cuts': num_cuts,
-                            'mat_use_sqin': mat_use_sqin,
-                            'sheet_area_sqin': sheet_area_sqin,
-                            'surf_area_sqin': surf_area_sqin,
-                            'volume_in3': volume_in3,
-                            'length_in': length_in,
-                            'thickness': thickness,
-                            'source_file': os.path.basename(json_file)
-                        }
+                # Extract part material properties
+                part_material_type = part.get('materialType', material_type)
+                part_material_grade = part.get('materialGrade', material_grade)
+                part_material_thickness = part.get('materialThickness', material_thickness)
+                part_finish = part.get('finish', finish)
                 
-                # Now extract pricing data
-                pricing_data = quote_data.get('pricing', {})
-                pricing_parts = pricing_data.get('parts', [])
+                # Extract part dimensions and properties
+                body = part.get('body') or {}
+                cut_len_in = body.get('cutLenIn', 0)
+                num_cuts = body.get('numCuts', 0)
+                mat_use_sqin = body.get('matUseSqin', 0)
+                sheet_area_sqin = body.get('sheetAreaSqin', 0)
+                surf_area_sqin = body.get('surfAreaSqin', 0)
+                volume_in3 = body.get('volumeIn3', 0)
+                length_in = body.get('lengthIn', 0)
+                thickness = body.get('thickness', 0)
                 
-                for pricing_part in pricing_parts:
-                    part_id = pricing_part.get('id', '')
-                    total = pricing_part.get('total', {})
-                    price_per_part = total.get('pricePerPart', 0)
-                    
-                    # Get the corresponding part data
-                    if part_id in part_data_map:
-                        part_data = part_data_map[part_id].copy()
-                        part_data['part_id'] = part_id
-                        part_data['price_per_part'] = price_per_part / 100.0
-                        all_data.append(part_data)
-                        
-        except Exception as e:
-            print(f"Error processing {json_file}: {e}")
-            continue
+                # Store part data in PART_FIELDS order
+                part_rows[part_id] = (
+                    part_name, part_number, quantity,
+                    part_material_type, part_material_grade, part_material_thickness, part_finish,
+                    cut_len_in, num_cuts, mat_use_sqin, sheet_area_sqin, surf_area_sqin,
+                    volume_in3, length_in, thickness,
+                    source_file
+                )
+        
+        # Now extract pricing data
+        for pricing_part in pricing_parts:
+            try:
+                part_id = pricing_part['id']
+                price_per_part = pricing_part['total']['pricePerPart']
+            except (KeyError, TypeError):
+                continue
+            # Check the price before appending anything so a bad one cannot leave the columns ragged
+            if isinstance(price_per_part, bool) or not isinstance(price_per_part, (int, float)):
+                continue
+            
+            # Get the corresponding part data
+            part_row = part_rows.get(part_id)
+            if part_row is not None:
+                for field, value in zip(PART_FIELDS, part_row):
+                    columns[field].append(value)
+                columns['part_id'].append(part_id)
+                columns['price_per_part'].append(price_per_part / 100.0)
+
+def extract_pricing_data():
+    """Extract pricing data from all JSON files in the data directory"""
+    
+    data_dir = "/mnt/c/Users/kgdev/SwiftFab/data"
+    # One list per CSV column instead of one dict per part
+    columns = defaultdict(list)
+    
+    # Walk the JSON files lazily; only the first few are held to pick a strategy
+    json_files = _iter_json_files(data_dir)
+    first_files = list(islice(json_files, PARALLEL_MIN_FILES))
     
-    return all_data
+    print(f"Processing JSON files in {data_dir}...")
+    
+    # Files are independent, so parse them across processes unless there are too
+    # few to pay for the worker startup
+    if len(first_files) < PARALLEL_MIN_FILES:
+        file_count = _merge_columns(columns, map(_process_one, first_files))
+    else:
+        with ProcessPoolExecutor() as executor:
+            file_results = executor.map(_process_one, chain(first_files, json_files), chunksize=16)
+            file_count = _merge_columns(columns, file_results)
+    
+    print(f"Processed {file_count} JSON files")
+    
+    return columns
+
+def _iter_json_files(root):
+    """
+    Yield every .json/.jsonl file (or gzipped .gz of either) under root, skipping hidden entries like glob does
+    
+    Same order as the recursive glob it replaced: a directory's own files first,
+    then each subdirectory depth-first, both in listing order, so the CSV rows
+    (and which duplicate the finish analysis keeps) don't change.
+    """
+    stack = [root]
+    while stack:
+        subdirs = []
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.endswith(('.json', '.json.gz', '.jsonl', '.jsonl.gz')):
+                    yield entry.path
+        # Reversed onto the stack so the first listed subdirectory is walked next
+        stack.extend(reversed(subdirs))
+
+def _merge_columns(columns, file_results):
+    """Append each file's column lists onto the combined columns, return the file count"""
+    file_count = 0
+    for file_columns in file_results:
+        file_count += 1
+        for field, values in file_columns.items():
+            columns[field].extend(values)
+    return file_count
 
 def create_csv_file(data, filename="pricing_data.csv"):
-    """Create CSV file with extracted data"""
+    """Create CSV file with extracted data (a dict of column lists)"""
     
-    if not data:
+    if not data or not data['part_id']:
         print("No data to write to CSV")
         return
     
-    # Get all fieldnames from the first record
-    fieldnames = list(data[0].keys())
+    fieldnames = list(data.keys())
     
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+        writer = csv.writer(csvfile)
+        writer.writerow(fieldnames)
+        # Rows are zipped straight out of the column lists, no per-row dicts
+        writer.writerows(zip(*(data[field] for field in fieldnames)))
     
     print(f"Created CSV file: {filename}")
-    print(f"Total records: {len(data)}")
+    print(f"Total records: {len(data['part_id'])}")
     
     return data
 
@@ -147,7 +210,7 @@ def main():
     # Extract data
     data = extract_pricing_data()
     
-    if not data:
+    if not data['part_id']:
         print("No data extracted. Exiting.")
         return
     
@@ -156,7 +219,7 @@ def main():
     
     print(f"\n=== SUMMARY ===")
     print(f"Data extraction completed successfully!")
-    print(f"Total parts analyzed: {len(data)}")
+    print(f"Total parts analyzed: {len(data['part_id'])}")
     print(f"Files created:")
     print(f"  - pricing_data.csv")
 
@@ -6,18 +6,54 @@ Final No Base Price Version Part Pricing Analysis Script
 - All rates are positive
 """
 
+import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
-from scipy.optimize import minimize
+from scipy.optimize import nnls
 import warnings
 warnings.filterwarnings('ignore')
 
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
-plt.rcParams['axes.unicode_minus'] = False
+# Lower bound for every fitted coefficient (base costs and rates)
+MIN_COEFFICIENT = 0.001
+
+# Columns read from pricing_data.csv and their types
+CSV_DTYPES = {
+    'part_number': 'str',
+    'material_type': 'category',
+    'material_grade': 'category',
+    'material_thickness': 'float64',
+    'finish': 'category',
+    'num_cuts': 'float64',
+    'mat_use_sqin': 'float64',
+    'surf_area_sqin': 'float64',
+    'price_per_part': 'float64'
+}
+
+def _regression_metrics(y, y_pred):
+    """R², RMSE, MAE and MAPE from a single pass over the residuals"""
+    residuals = y - y_pred
+    abs_residuals = np.abs(residuals)
+    sse = residuals @ residuals
+    tss = ((y - y.mean()) ** 2).sum()
+    
+    # MAPE over the rows with a non-zero target, 0 when there are none
+    nonzero = y != 0
+    nonzero_count = np.count_nonzero(nonzero)
+    ratios = np.divide(abs_residuals, np.abs(y), out=np.zeros_like(abs_residuals), where=nonzero)
+    mape = ratios.sum() / nonzero_count * 100 if nonzero_count else 0.0
+    
+    # Constant targets have no variance to explain: 1 for a perfect fit, else 0 (as sklearn does)
+    if tss:
+        r2 = 1 - sse / tss
+    else:
+        r2 = 1.0 if sse == 0 else 0.0
+    
+    return {
+        'r2': r2,
+        'rmse': np.sqrt(sse / len(y)),
+        'mae': abs_residuals.mean(),
+        'mape': mape
+    }
 
 class FinalPricingAnalyzer:
     def __init__(self, data_file):
@@ -25,88 +61,126 @@ class FinalPricingAnalyzer:
         self.df = None
         self.material_grade_combinations = {}
         self.finish_parameters = {}
+        self.combo_keys = {}
+        self.combo_labels = {}
         
     def load_data(self):
         """Load and preprocess data"""
         print("Loading data...")
-        self.df = pd.read_csv(self.data_file)
-        
-        # Data preprocessing
-        self.df['material_thickness'] = pd.to_numeric(self.df['material_thickness'], errors='coerce')
-        self.df['price_per_part'] = pd.to_numeric(self.df['price_per_part'], errors='coerce')
-        self.df['material_grade_combo'] = self.df['material_type'] + '_' + self.df['material_grade']
-        
-        print(f"Data loaded: {len(self.df)} records, {self.df['material_grade_combo'].nunique()} material-grade combinations")
+        # Reuse the columns cached from the last parse while the CSV is unchanged
+        cache_file = os.path.join(os.path.dirname(self.data_file), '_pricing_cache.npz')
+        cache_key = f"{os.stat(self.data_file).st_mtime_ns}:{','.join(CSV_DTYPES)}"
+        self.df = self._read_column_cache(cache_file, cache_key)
+        if self.df is None:
+            # Only the columns the analysis reads, with their types fixed up front; the
+            # categoricals make the finish filters and combo grouping integer compares
+            self.df = pd.read_csv(self.data_file, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES)
+            self._write_column_cache(cache_file, cache_key)
+        material_type = self.df['material_type']
+        material_grade = self.df['material_grade']
+        
+        # Integer combo code per row (-1 where type or grade is missing), labels kept aside for display
+        type_codes = material_type.cat.codes.to_numpy(np.int32)
+        grade_codes = material_grade.cat.codes.to_numpy(np.int32)
+        grade_count = len(material_grade.cat.categories)
+        combo_codes = np.where((type_codes < 0) | (grade_codes < 0), -1, type_codes * grade_count + grade_codes)
+        self.df['material_grade_combo'] = combo_codes
+        self.combo_keys = {
+            code: (material_type.cat.categories[code // grade_count], material_grade.cat.categories[code % grade_count])
+            for code in np.unique(combo_codes[combo_codes >= 0]).tolist()
+        }
+        self.combo_labels = {code: f"{mt}_{mg}" for code, (mt, mg) in self.combo_keys.items()}
+        
+        print(f"Data loaded: {len(self.df)} records, {len(self.combo_labels)} material-grade combinations")
+        
+    def _read_column_cache(self, cache_file, cache_key):
+        """Rebuild the loaded columns from the .npz cache, or None if it is missing or stale"""
+        try:
+            with np.load(cache_file, allow_pickle=False) as cache:
+                if cache['key'].item() != cache_key:
+                    return None
+                columns = {}
+                for column, dtype in CSV_DTYPES.items():
+                    if dtype == 'float64':
+                        columns[column] = cache[column]
+                    else:
+                        values = pd.Categorical.from_codes(cache[column + '.codes'], cache[column + '.categories'])
+                        columns[column] = pd.Series(values).astype(dtype)
+        except (OSError, KeyError, ValueError):
+            return None
+        print(f"Using cached columns: {cache_file}")
+        return pd.DataFrame(columns)
+        
+    def _write_column_cache(self, cache_file, cache_key):
+        """Store the loaded columns as plain arrays; text columns as category codes"""
+        arrays = {'key': np.array(cache_key)}
+        for column, dtype in CSV_DTYPES.items():
+            if dtype == 'float64':
+                arrays[column] = self.df[column].to_numpy()
+            else:
+                values = self.df[column].astype('category')
+                arrays[column + '.codes'] = values.cat.codes.to_numpy()
+                arrays[column + '.categories'] = values.cat.categories.to_numpy(dtype=str)
+        try:
+            np.savez(cache_file, **arrays)
+        except OSError as e:
+            print(f"Could not write column cache {cache_file}: {e}")
         
     def create_features(self):
         """Create feature variables"""
         self.df['material_area_thickness'] = self.df['mat_use_sqin'] * self.df['material_thickness']
         self.material_feature_columns = ['material_area_thickness', 'num_cuts']
+        
+        # Pull the fit inputs out of pandas once; float64 because NNLS runs in double
+        # precision anyway and prices need the digits
+        self._material_area_thickness = self.df['material_area_thickness'].to_numpy(np.float64)
+        self._num_cuts = self.df['num_cuts'].to_numpy(np.float64)
+        self._price = self.df['price_per_part'].to_numpy(np.float64)
+        
+        # Row indices of the No Deburring records per combo, in order of first appearance
+        combo_codes = self.df['material_grade_combo'].to_numpy()
+        rows = np.flatnonzero((self.df['finish'] == 'No Deburring').to_numpy() & (combo_codes >= 0))
+        row_codes = combo_codes[rows]
+        codes, first_rows, counts = np.unique(row_codes, return_index=True, return_counts=True)
+        groups = np.split(rows[np.argsort(row_codes, kind='stable')], np.cumsum(counts)[:-1])
+        self._combo_rows = {codes[i]: groups[i] for i in np.argsort(first_rows)}
+        
         print(f"Features created: {self.material_feature_columns}")
         
     def constrained_linear_regression(self, X, y):
-        """Constrained linear regression with positive rate coefficients"""
-        n_features = X.shape[1]
-        
-        def objective(params):
-            y_pred = np.dot(X, params)
-            return np.sum((y - y_pred) ** 2)
-        
-        def constraint(params):
-            return params - 0.001
-        
-        # Smart initial values
-        feature_means = np.mean(X, axis=0)
-        y_mean = np.mean(y)
-        
-        x0 = np.zeros(n_features)
-        x0[0] = y_mean * 0.1  # Base cost
-        for i in range(1, n_features):
-            x0[i] = (y_mean / feature_means[i]) * 0.1 if feature_means[i] > 0 else 0.01
-        
-        # Optimization
-        result = minimize(objective, x0, method='SLSQP', constraints={'type': 'ineq', 'fun': constraint})
-        
-        if result.success:
-            return result.x
-        else:
-            # add warning
-            print("Warning: Constrained linear regression failed, using simple linear regression")
-            # Fallback with positive constraints
-            model = LinearRegression(fit_intercept=False)
-            model.fit(X, y)
-            coefs = model.coef_
-            if n_features > 1:
-                coefs[1:] = np.maximum(coefs[1:], 0.001)
-            else:
-                coefs = np.maximum(coefs, 0.001)
-            return coefs
+        """Constrained linear regression with positive rate coefficients
+        
+        Every coefficient is kept >= MIN_COEFFICIENT by solving the shifted problem
+        X @ (b + MIN_COEFFICIENT) ~ y with b >= 0 as non-negative least squares.
+        """
+        floor = np.full(X.shape[1], MIN_COEFFICIENT)
+        coefs, _ = nnls(X, y - X @ floor)
+        return coefs + floor
     
     def analyze_material_grade_combinations(self):
         """Analyze material-grade combination parameters"""
         print("\n=== Material-Grade Analysis ===")
         
-        filtered_df = self.df[self.df['finish'] == 'No Deburring'].copy()
-        print(f"Using {len(filtered_df)} 'No Deburring' records")
+        print(f"Using {(self.df['finish'] == 'No Deburring').sum()} 'No Deburring' records")
         
         results = {}
-        for combo in filtered_df['material_grade_combo'].unique():
-            print(f"\nAnalyzing: {combo}")
-            combo_data = filtered_df[filtered_df['material_grade_combo'] == combo].copy()
+        for combo, rows in self._combo_rows.items():
+            material_type, material_grade = self.combo_keys[combo]
+            print(f"\nAnalyzing: {self.combo_labels[combo]}")
             
             # Prepare data with base cost column
-            X = np.column_stack([np.ones(len(combo_data)), combo_data[self.material_feature_columns].values])
-            y = combo_data['price_per_part'].values
+            X = np.empty((len(rows), 3))
+            X[:, 0] = 1.0
+            np.take(self._material_area_thickness, rows, out=X[:, 1])
+            np.take(self._num_cuts, rows, out=X[:, 2])
+            y = self._price[rows]
             
             # Fit model
             coefs = self.constrained_linear_regression(X, y)
             y_pred = np.dot(X, coefs)
             
             # Calculate metrics
-            r2 = r2_score(y, y_pred)
-            rmse = np.sqrt(mean_squared_error(y, y_pred))
-            mae = mean_absolute_error(y, y_pred)
-            mape = np.mean(np.abs((y - y_pred) / y)) * 100
+            metrics = _regression_metrics(y, y_pred)
             
             params = {
                 'material_base': coefs[0],
@@ -114,13 +188,15 @@ class FinalPricingAnalyzer:
                 'cut_count_rate': coefs[2]
             }
             
-            results[combo] = {
+            results[self.combo_labels[combo]] = {
+                'material_type': material_type,
+                'material_grade': material_grade,
                 'params': params,
-                'metrics': {'r2': r2, 'rmse': rmse, 'mae': mae, 'mape': mape},
-                'data_count': len(combo_data)
+                'metrics': metrics,
+                'data_count': len(y)
             }
             
-            print(f"  R²: {r2:.4f}, RMSE: {rmse:.2f}")
+            print(f"  R²: {metrics['r2']:.4f}, RMSE: {metrics['rmse']:.2f}")
             print(f"  Base: {params['material_base']:.2f}, Material: {params['material_rate']:.4f}, Cut: {params['cut_count_rate']:.4f}")
         
         self.material_grade_combinations = results
@@ -131,54 +207,44 @@ class FinalPricingAnalyzer:
         """Analyze finish parameters using offset from No Deburring baseline"""
         print("\n=== Finish Analysis ===")
         
-        finishes = [f for f in self.df['finish'].unique() if f != 'No Deburring']
-        no_deburring_data = self.df[self.df['finish'] == 'No Deburring'].copy()
+        # One No Deburring baseline price per part/material, joined onto each finish
+        baseline_keys = ['part_number', 'material_type', 'material_grade', 'material_thickness']
+        baseline = (
+            self.df.loc[self.df['finish'] == 'No Deburring', baseline_keys + ['price_per_part']]
+            .dropna(subset=baseline_keys)
+            .drop_duplicates(subset=baseline_keys, keep='first')
+            .rename(columns={'price_per_part': 'baseline_price'})
+        )
         results = {}
         
-        for finish in finishes:
+        # One pass hands each finish its rows instead of re-masking the frame per finish
+        for finish, finish_data in self.df.groupby('finish', sort=False, observed=True):
+            if finish == 'No Deburring':
+                continue
             print(f"\nAnalyzing: {finish}")
-            finish_data = self.df[self.df['finish'] == finish].copy()
             
             # Create offset data
-            offset_data = []
-            for _, finish_row in finish_data.iterrows():
-                matching_baseline = no_deburring_data[
-                    (no_deburring_data['part_number'] == finish_row['part_number']) &
-                    (no_deburring_data['material_type'] == finish_row['material_type']) &
-                    (no_deburring_data['material_grade'] == finish_row['material_grade']) &
-                    (no_deburring_data['material_thickness'] == finish_row['material_thickness'])
-                ]
-                
-                if len(matching_baseline) > 0:
-                    baseline_price = matching_baseline.iloc[0]['price_per_part']
-                    offset_price = finish_row['price_per_part'] - baseline_price
-                    
-                    # Use different surface area metrics for different finishes
-                    surface_area = finish_row['surf_area_sqin'] if finish != 'Deburred' else finish_row['mat_use_sqin']
-                    
-                    offset_data.append({
-                        'surface_area': surface_area,
-                        'offset_price': offset_price
-                    })
+            merged = finish_data.merge(baseline, on=baseline_keys, how='inner')
+            y = merged['price_per_part'].to_numpy(np.float64) - merged['baseline_price'].to_numpy(np.float64)
             
-            if len(offset_data) < 5:
-                print(f"  Skipping: too few matched records ({len(offset_data)})")
+            # Use different surface area metrics for different finishes
+            surface_area = merged['surf_area_sqin' if finish != 'Deburred' else 'mat_use_sqin'].to_numpy(np.float64)
+            
+            if len(y) < 5:
+                print(f"  Skipping: too few matched records ({len(y)})")
                 continue
                 
             # Prepare data with base cost column
-            offset_df = pd.DataFrame(offset_data)
-            X = np.column_stack([np.ones(len(offset_df)), offset_df[['surface_area']].values.flatten()])
-            y = offset_df['offset_price'].values
+            X = np.empty((len(y), 2))
+            X[:, 0] = 1.0
+            X[:, 1] = surface_area
             
             # Fit model
             coefs = self.constrained_linear_regression(X, y)
             y_pred = np.dot(X, coefs)
             
             # Calculate metrics
-            r2 = r2_score(y, y_pred)
-            rmse = np.sqrt(mean_squared_error(y, y_pred))
-            mae = mean_absolute_error(y, y_pred)
-            mape = np.mean(np.abs((y - y_pred) / y)) * 100 if len(y[y != 0]) > 0 else 0
+            metrics = _regression_metrics(y, y_pred)
             
             params = {
                 'finish_base': coefs[0],
@@ -187,11 +253,11 @@ class FinalPricingAnalyzer:
             
             results[finish] = {
                 'params': params,
-                'metrics': {'r2': r2, 'rmse': rmse, 'mae': mae, 'mape': mape},
-                'data_count': len(offset_data)
+                'metrics': metrics,
+                'data_count': len(y)
             }
             
-            print(f"  R²: {r2:.4f}, RMSE: {rmse:.2f}")
+            print(f"  R²: {metrics['r2']:.4f}, RMSE: {metrics['rmse']:.2f}")
             print(f"  Base: {params['finish_base']:.2f}, Surface: {params['surface_rate']:.4f}")
         
         self.finish_parameters = results
@@ -202,113 +268,42 @@ class FinalPricingAnalyzer:
         """Create comprehensive analysis visualizations"""
         print("\nCreating visualizations...")
         
-        # Create a comprehensive analysis plot
-        fig = plt.figure(figsize=(20, 12))
+        # matplotlib is only needed here, so the fitting runs never pay for importing it
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
+        plt.rcParams['axes.unicode_minus'] = False
+        
+        # Create a comprehensive analysis plot, reusing the dashboard figure on re-runs
+        fig = plt.figure('dashboard', figsize=(20, 12), clear=True)
         
-        # 1. Material analysis - Base costs
-        ax1 = plt.subplot(2, 4, 1)
+        # 1-4. Material analysis - Base costs, material rates, cut count rates, R² scores
         combinations = list(self.material_grade_combinations.keys())
-        base_costs = [self.material_grade_combinations[c]['params']['material_base'] for c in combinations]
-        bars1 = ax1.bar(range(len(combinations)), base_costs, color='skyblue', alpha=0.7)
-        ax1.set_title('Material Base Costs', fontsize=12, fontweight='bold')
-        ax1.set_xticks(range(len(combinations)))
-        ax1.set_xticklabels(combinations, rotation=45, ha='right', fontsize=8)
-        ax1.set_ylabel('Base Cost ($)')
-        for i, bar in enumerate(bars1):
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height, f'{base_costs[i]:.1f}',
-                    ha='center', va='bottom', fontsize=8)
-        
-        # 2. Material analysis - Material rates
-        ax2 = plt.subplot(2, 4, 2)
-        material_rates = [self.material_grade_combinations[c]['params']['material_rate'] for c in combinations]
-        bars2 = ax2.bar(range(len(combinations)), material_rates, color='lightgreen', alpha=0.7)
-        ax2.set_title('Material Rates', fontsize=12, fontweight='bold')
-        ax2.set_xticks(range(len(combinations)))
-        ax2.set_xticklabels(combinations, rotation=45, ha='right', fontsize=8)
-        ax2.set_ylabel('Rate ($/sq in)')
-        for i, bar in enumerate(bars2):
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height, f'{material_rates[i]:.3f}',
-                    ha='center', va='bottom', fontsize=8)
-        
-        # 3. Material analysis - Cut count rates
-        ax3 = plt.subplot(2, 4, 3)
-        cut_rates = [self.material_grade_combinations[c]['params']['cut_count_rate'] for c in combinations]
-        bars3 = ax3.bar(range(len(combinations)), cut_rates, color='lightcoral', alpha=0.7)
-        ax3.set_title('Cut Count Rates', fontsize=12, fontweight='bold')
-        ax3.set_xticks(range(len(combinations)))
-        ax3.set_xticklabels(combinations, rotation=45, ha='right', fontsize=8)
-        ax3.set_ylabel('Rate ($/cut)')
-        for i, bar in enumerate(bars3):
-            height = bar.get_height()
-            ax3.text(bar.get_x() + bar.get_width()/2., height, f'{cut_rates[i]:.3f}',
-                    ha='center', va='bottom', fontsize=8)
-        
-        # 4. Material analysis - R² scores
-        ax4 = plt.subplot(2, 4, 4)
-        r2_scores = [self.material_grade_combinations[c]['metrics']['r2'] for c in combinations]
-        bars4 = ax4.bar(range(len(combinations)), r2_scores, color='gold', alpha=0.7)
-        ax4.set_title('Model Fit (R²)', fontsize=12, fontweight='bold')
-        ax4.set_xticks(range(len(combinations)))
-        ax4.set_xticklabels(combinations, rotation=45, ha='right', fontsize=8)
-        ax4.set_ylabel('R² Score')
-        ax4.set_ylim(0, 1)
-        for i, bar in enumerate(bars4):
-            height = bar.get_height()
-            ax4.text(bar.get_x() + bar.get_width()/2., height, f'{r2_scores[i]:.3f}',
-                    ha='center', va='bottom', fontsize=8)
-        
-        # 5. Finish analysis - Base costs
-        ax5 = plt.subplot(2, 4, 5)
+        base_costs, material_rates, cut_rates, r2_scores = zip(*[
+            (result['params']['material_base'], result['params']['material_rate'],
+             result['params']['cut_count_rate'], result['metrics']['r2'])
+            for result in self.material_grade_combinations.values()
+        ]) if combinations else ((),) * 4
+        self._bar_panel(plt.subplot(2, 4, 1), combinations, base_costs, 'Material Base Costs', 'Base Cost ($)', '{:.1f}', 'skyblue', 8)
+        self._bar_panel(plt.subplot(2, 4, 2), combinations, material_rates, 'Material Rates', 'Rate ($/sq in)', '{:.3f}', 'lightgreen', 8)
+        self._bar_panel(plt.subplot(2, 4, 3), combinations, cut_rates, 'Cut Count Rates', 'Rate ($/cut)', '{:.3f}', 'lightcoral', 8)
+        self._bar_panel(plt.subplot(2, 4, 4), combinations, r2_scores, 'Model Fit (R²)', 'R² Score', '{:.3f}', 'gold', 8, ylim=(0, 1))
+        
+        # 5-7. Finish analysis - Base costs, surface rates, R² scores
         finishes = list(self.finish_parameters.keys())
-        finish_bases = [self.finish_parameters[f]['params']['finish_base'] for f in finishes]
-        bars5 = ax5.bar(range(len(finishes)), finish_bases, color='plum', alpha=0.7)
-        ax5.set_title('Finish Base Costs', fontsize=12, fontweight='bold')
-        ax5.set_xticks(range(len(finishes)))
-        ax5.set_xticklabels(finishes, rotation=45, ha='right', fontsize=10)
-        ax5.set_ylabel('Base Cost ($)')
-        for i, bar in enumerate(bars5):
-            height = bar.get_height()
-            ax5.text(bar.get_x() + bar.get_width()/2., height, f'{finish_bases[i]:.2f}',
-                    ha='center', va='bottom', fontsize=10)
-        
-        # 6. Finish analysis - Surface rates
-        ax6 = plt.subplot(2, 4, 6)
-        surface_rates = [self.finish_parameters[f]['params']['surface_rate'] for f in finishes]
-        bars6 = ax6.bar(range(len(finishes)), surface_rates, color='lightblue', alpha=0.7)
-        ax6.set_title('Surface Rates', fontsize=12, fontweight='bold')
-        ax6.set_xticks(range(len(finishes)))
-        ax6.set_xticklabels(finishes, rotation=45, ha='right', fontsize=10)
-        ax6.set_ylabel('Rate ($/sq in)')
-        for i, bar in enumerate(bars6):
-            height = bar.get_height()
-            ax6.text(bar.get_x() + bar.get_width()/2., height, f'{surface_rates[i]:.4f}',
-                    ha='center', va='bottom', fontsize=10)
-        
-        # 7. Finish analysis - R² scores
-        ax7 = plt.subplot(2, 4, 7)
-        finish_r2 = [self.finish_parameters[f]['metrics']['r2'] for f in finishes]
-        bars7 = ax7.bar(range(len(finishes)), finish_r2, color='orange', alpha=0.7)
-        ax7.set_title('Finish Model Fit (R²)', fontsize=12, fontweight='bold')
-        ax7.set_xticks(range(len(finishes)))
-        ax7.set_xticklabels(finishes, rotation=45, ha='right', fontsize=10)
-        ax7.set_ylabel('R² Score')
-        ax7.set_ylim(0, 1)
-        for i, bar in enumerate(bars7):
-            height = bar.get_height()
-            ax7.text(bar.get_x() + bar.get_width()/2., height, f'{finish_r2[i]:.3f}',
-                    ha='center', va='bottom', fontsize=10)
+        finish_bases, surface_rates, finish_r2 = zip(*[
+            (result['params']['finish_base'], result['params']['surface_rate'], result['metrics']['r2'])
+            for result in self.finish_parameters.values()
+        ]) if finishes else ((),) * 3
+        self._bar_panel(plt.subplot(2, 4, 5), finishes, finish_bases, 'Finish Base Costs', 'Base Cost ($)', '{:.2f}', 'plum', 10)
+        self._bar_panel(plt.subplot(2, 4, 6), finishes, surface_rates, 'Surface Rates', 'Rate ($/sq in)', '{:.4f}', 'lightblue', 10)
+        self._bar_panel(plt.subplot(2, 4, 7), finishes, finish_r2, 'Finish Model Fit (R²)', 'R² Score', '{:.3f}', 'orange', 10, ylim=(0, 1))
         
         # 8. Parameter correlation heatmap
         ax8 = plt.subplot(2, 4, 8)
-        params_matrix = []
-        for combo in combinations:
-            params = self.material_grade_combinations[combo]['params']
-            params_matrix.append([params['material_base'], params['material_rate'], params['cut_count_rate']])
-        
-        params_matrix = np.array(params_matrix)
-        im = ax8.imshow(params_matrix.T, cmap='viridis', aspect='auto')
+        params_matrix = np.array([base_costs, material_rates, cut_rates])
+        im = ax8.imshow(params_matrix, cmap='viridis', aspect='auto')
         ax8.set_title('Parameter Heatmap', fontsize=12, fontweight='bold')
         ax8.set_xticks(range(len(combinations)))
         ax8.set_xticklabels(combinations, rotation=45, ha='right', fontsize=8)
@@ -322,33 +317,41 @@ class FinalPricingAnalyzer:
         
         plt.suptitle('Comprehensive Pricing Analysis Dashboard', fontsize=16, fontweight='bold')
         plt.tight_layout()
-        plt.savefig('data/comprehensive_pricing_analysis.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        # A handful of bars reads fine at 150 dpi and encodes a quarter of the pixels
+        dpi = 300 if max(len(self.material_grade_combinations), len(self.finish_parameters)) > 10 else 150
+        fig.savefig('data/comprehensive_pricing_analysis.png', dpi=dpi, bbox_inches='tight',
+                    pil_kwargs={'compress_level': 6})
         
         print("Comprehensive analysis plot saved: data/comprehensive_pricing_analysis.png")
         
+    @staticmethod
+    def _bar_panel(ax, labels, values, title, ylabel, fmt, color, fontsize, ylim=None):
+        """Draw one labelled bar chart panel of the dashboard"""
+        xs = range(len(labels))
+        bars = ax.bar(xs, values, color=color, alpha=0.7)
+        ax.set_title(title, fontsize=12, fontweight='bold')
+        ax.set_xticks(xs)
+        ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=fontsize)
+        ax.set_ylabel(ylabel)
+        if ylim is not None:
+            ax.set_ylim(*ylim)
+        ax.bar_label(bars, labels=[fmt.format(v) for v in values], fontsize=fontsize)
+        
     def _save_material_parameters(self, results):
         """Save material parameters to CSV"""
-        data = []
-        for combo, result in results.items():
-            parts = combo.split('_')
-            params = result['params']
-            metrics = result['metrics']
-            
-            data.append({
-                'material_type': parts[0],
-                'material_grade': parts[1],
-                'material_base': params['material_base'],
-                'material_rate': params['material_rate'],
-                'cut_count_rate': params['cut_count_rate'],
-                'r2': metrics['r2'],
-                'rmse': metrics['rmse'],
-                'mae': metrics['mae'],
-                'mape': metrics['mape'],
-                'data_count': result['data_count']
-            })
-        
-        df = pd.DataFrame(data)
+        rows = results.values()
+        df = pd.DataFrame({
+            'material_type': [result['material_type'] for result in rows],
+            'material_grade': [result['material_grade'] for result in rows],
+            'material_base': [result['params']['material_base'] for result in rows],
+            'material_rate': [result['params']['material_rate'] for result in rows],
+            'cut_count_rate': [result['params']['cut_count_rate'] for result in rows],
+            'r2': [result['metrics']['r2'] for result in rows],
+            'rmse': [result['metrics']['rmse'] for result in rows],
+            'mae': [result['metrics']['mae'] for result in rows],
+            'mape': [result['metrics']['mape'] for result in rows],
+            'data_count': [result['data_count'] for result in rows]
+        })
         df.to_csv('data/final_material_parameters.csv', index=False)
         print("Material parameters saved: final_material_parameters.csv")
         
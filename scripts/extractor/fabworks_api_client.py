@@ -4,20 +4,57 @@ Flexible Fabworks tRPC API client with authentication support
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# orjson is optional; it encodes request bodies and decodes quote responses much faster
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(data):
+        return json.dumps(data).encode('utf-8')
+    _json_loads = json.loads
 
 class FabworksAPIClient:
-    def __init__(self, cookies=None):
+    def __init__(self, cookies=None, pool_maxsize=64, proxy=None, verify=True):
         """
         Initialize the Fabworks API client
         
         Args:
             cookies (str): Cookie string from authenticated browser session
+            pool_maxsize (int): Keep-alive connections kept per host, at least the number of concurrent callers
+            proxy (str): Proxy URL for all requests; None leaves requests' environment lookup (HTTPS_PROXY etc.)
+            verify (bool): Verify SSL certificates; turn off only behind a TLS-intercepting proxy
         """
         self.base_url = "https://www.fabworks.com/api/trpc"
         self.cookies = cookies or self._get_default_cookies()
         self.session = requests.Session()
+        # Fixed for the client's lifetime, so one warmed connection pool serves every call
+        if proxy:
+            self.session.proxies.update({"http": proxy, "https": proxy})
+        self.session.verify = verify
+        
+        # Larger keep-alive pool for concurrent callers, and retry transient failures
+        # with backoff (parts.update only sets fields, so retrying the POST is safe)
+        retries = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=["GET", "POST"],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=pool_maxsize, max_retries=retries)
+        # Mounted for both schemes so plain-http endpoints (e.g. a local mirror) also reuse connections
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         
         # Set default headers
         self.headers = {
@@ -34,6 +71,11 @@ class FabworksAPIClient:
             "Sec-Fetch-Mode": "cors",
             "Sec-Fetch-Site": "same-origin"
         }
+        # Static headers live on the session so each request doesn't pass them again
+        self.session.headers.update(self.headers)
+        
+        # quote_id -> (ETag, parsed quote details) of the last full quotes.detail response
+        self._etag_cache = {}
     
     def _get_default_cookies(self):
         """Default authenticated cookies"""
@@ -52,46 +94,54 @@ class FabworksAPIClient:
             requests.Response: The response object
         """
         if batch:
-            url = f"{self.base_url}/{method_name}?batch=1"
-            
             # Handle multiple data items for true batching
             if isinstance(data, list):
+                # tRPC pairs input i with the i-th procedure in the comma-separated path
+                url = f"{self.base_url}/{','.join([method_name] * len(data))}?batch=1"
                 payload = {}
                 for i, item in enumerate(data):
                     payload[str(i)] = {"json": item}
             else:
                 # Single item
+                url = f"{self.base_url}/{method_name}?batch=1"
                 payload = {"0": {"json": data}}
         else:
             url = f"{self.base_url}/{method_name}"
             payload = data
         
         try:
-            print(f"🚀 Calling tRPC method: {method_name}")
-            print(f"🎯 URL: {url}")
-            print(f"📦 Payload: {json.dumps(payload, indent=2)}")
+            logger.info(f"🚀 Calling tRPC method: {method_name}")
+            # Full request/response dumps only when debug logging is on
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug(f"🎯 URL: {url}")
+                logger.debug(f"📦 Payload: {json.dumps(payload, indent=2)}")
             
-            response = self.session.post(url, json=payload, headers=self.headers)
+            # Content-Type: application/json is already a session header
+            response = self.session.post(url, data=_json_dumps(payload))
             
-            print(f"📊 Response Status: {response.status_code}")
+            # Read the body once; it is parsed once and only re-serialized for debug dumps
+            raw = response.content
+            logger.debug(f"📊 Response Status: {response.status_code} ({len(raw)} bytes)")
             
             try:
-                response_data = response.json()
-                print(f"📄 Response: {json.dumps(response_data, indent=2)}")
+                response_data = _json_loads(raw)
+                if debug:
+                    logger.debug(f"📄 Response: {json.dumps(response_data, indent=2)}")
                 
                 if response.status_code == 200:
-                    print("✅ API call successful!")
+                    logger.info("✅ API call successful!")
                     return response_data
                 else:
-                    print(f"❌ API call failed with status: {response.status_code}")
+                    logger.error(f"❌ API call failed with status: {response.status_code}")
                     
             except ValueError:
-                print(f"📄 Non-JSON Response: {response.text}")
+                logger.error(f"📄 Non-JSON Response: {response.text}")
             
             return response
             
         except requests.exceptions.RequestException as e:
-            print(f"❌ Request failed: {e}")
+            logger.error(f"❌ Request failed: {e}")
             return None
     
     
@@ -111,7 +161,7 @@ class FabworksAPIClient:
         Returns:
             Single API response containing results for all updates
         """
-        print(f"🚀 Batching {len(part_updates)} part updates into single API call...")
+        logger.info(f"🚀 Batching {len(part_updates)} part updates into single API call...")
         
         # Prepare batch data
         batch_data = []
@@ -119,12 +169,12 @@ class FabworksAPIClient:
             update_data = {"id": part_update['part_id'], **part_update['updates']}
             batch_data.append(update_data)
         
-        print(f"📦 Batch contains {len(batch_data)} part updates")
+        logger.info(f"📦 Batch contains {len(batch_data)} part updates")
         
         # Make single batched API call
         result = self.call_trpc_method("parts.update", batch_data)
         
-        print(f"✅ Batch update completed with single API call!")
+        logger.info(f"✅ Batch update completed with single API call!")
         return result
     
     def update_single_part(self, part_id, updates):
@@ -138,7 +188,7 @@ class FabworksAPIClient:
         Returns:
             API response for the single part update
         """
-        print(f"🔄 Updating single part: {part_id}")
+        logger.info(f"🔄 Updating single part: {part_id}")
         
         # Prepare update data
         update_data = {"id": part_id, **updates}
@@ -146,12 +196,12 @@ class FabworksAPIClient:
         # Make single API call (non-batch)
         result = self.call_trpc_method("parts.update", update_data, batch=True)
         
-        print(f"✅ Single part update completed!")
+        logger.info(f"✅ Single part update completed!")
         return result
 
-    def update_multiple_parts(self, part_updates):
+    def update_multiple_parts(self, part_updates, max_workers=8):
         """
-        Update multiple parts using sequential API calls (instead of batch)
+        Update multiple parts using separate API calls (instead of batch), several in flight at once
         
         Args:
             part_updates (list): List of dictionaries, each containing:
@@ -161,30 +211,29 @@ class FabworksAPIClient:
                     {'part_id': 'part_123', 'updates': {'materialThickness': '0.25'}},
                     {'part_id': 'part_456', 'updates': {'materialThickness': '0.125', 'finish': 'Deburred'}}
                 ]
+            max_workers (int): Maximum number of part updates in flight at once
         
         Returns:
-            List of API responses for each part update
+            List of API responses for each part update, in input order
         """
-        print(f"🔄 Updating {len(part_updates)} parts using sequential API calls...")
+        logger.info(f"🔄 Updating {len(part_updates)} parts using up to {max_workers} concurrent API calls...")
         
-        results = []
-        for i, part_update in enumerate(part_updates, 1):
-            print(f"📝 Processing part {i}/{len(part_updates)}: {part_update['part_id']}")
-            
-            # Update single part
-            result = self.update_single_part(part_update['part_id'], part_update['updates'])
-            results.append(result)
-            
-            # Add small delay between calls to avoid overwhelming the server
-            # import time
-            # time.sleep(0.1)
+        def update_one(indexed_update):
+            i, part_update = indexed_update
+            logger.info(f"📝 Processing part {i}/{len(part_updates)}: {part_update['part_id']}")
+            return self.update_single_part(part_update['part_id'], part_update['updates'])
+        
+        # Each part is a separate record on the server, so their updates can overlap;
+        # the calls are network-bound and share the session's connection pool
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(part_updates)))) as executor:
+            results = list(executor.map(update_one, enumerate(part_updates, 1)))
         
-        print(f"✅ Sequential updates completed for {len(part_updates)} parts!")
+        logger.info(f"✅ Updates completed for {len(part_updates)} parts!")
         return results
     
     def update_all_parts_in_quote(self, quote_id, updates):
         """
-        Update all parts in a quote with the same parameters using sequential API calls
+        Update all parts in a quote with the same parameters using one batched API call
         
         Args:
             quote_id (str): The quote ID to get parts from
@@ -193,10 +242,11 @@ class FabworksAPIClient:
         Returns:
             Dictionary containing:
             - 'quote_details': The original quote details
-            - 'part_updates': Sequential update results
+            - 'part_updates': Batched update response (one entry per part)
             - 'summary': Summary of the updates
+            - 'error': Only present if the quote could not be read or the batch call failed
         """
-        print(f"🔍 Getting parts from quote: {quote_id}")
+        logger.info(f"🔍 Getting parts from quote: {quote_id}")
         
         # First, get the quote details to extract part IDs
         quote_response = self.get_quote_details(quote_id)
@@ -217,60 +267,98 @@ class FabworksAPIClient:
         if not all_parts:
             return {"error": "No parts found in quote", "quote_details": quote_data}
         
-        print(f"📋 Found {len(all_parts)} parts in quote")
+        logger.info(f"📋 Found {len(all_parts)} parts in quote")
+        
+        result = self.update_all_parts_by_ids([part['id'] for part in all_parts], updates)
+        result['quote_details'] = quote_data
+        return result
+    
+    def get_quote_part_ids(self, quote_id):
+        """
+        Fetch a quote once and list the IDs of all its parts
+        
+        Args:
+            quote_id (str): The quote ID to get parts from
+        
+        Returns:
+            List of part IDs, or None if the quote could not be read
+        """
+        quote_response = self.get_quote_details(quote_id)
+        if not quote_response or not isinstance(quote_response, list):
+            return None
+        
+        quote_data = quote_response[0].get('result', {}).get('data', {}).get('json')
+        if not quote_data:
+            return None
+        
+        return [
+            part['id']
+            for assembly in quote_data.get('assemblies', [])
+            for part in assembly.get('parts', [])
+        ]
+    
+    def update_all_parts_by_ids(self, part_ids, updates):
+        """
+        Apply the same updates to already-known parts in one batched API call
+        
+        Skips the quote fetch of update_all_parts_in_quote, for callers that
+        update the same parts repeatedly (see get_quote_part_ids).
         
+        Args:
+            part_ids (list): IDs of the parts to update
+            updates (dict): Dictionary of fields to update (applied to all parts)
+        
+        Returns:
+            Dictionary containing:
+            - 'part_updates': Batched update response (one entry per part)
+            - 'summary': Summary of the updates
+            - 'error': Only present if the batch call itself failed
+        """
         # Create part_updates list for batch update
-        part_updates = []
-        for part in all_parts:
-            part_updates.append({
-                'part_id': part['id'],
-                'updates': updates
-            })
+        part_updates = [{'part_id': part_id, 'updates': updates} for part_id in part_ids]
         
         # Show what we're about to update
-        print(f"📝 Will apply these updates to all {len(all_parts)} parts:")
+        logger.info(f"📝 Will apply these updates to all {len(part_ids)} parts:")
         for key, value in updates.items():
-            print(f"   - {key}: {value}")
-        
-        # Update all parts using sequential API calls
-        update_results = self.update_multiple_parts(part_updates)
-        
-        # Create summary - sequential response format
-        successful_updates = 0
-        failed_updates = 0
-        
-        if isinstance(update_results, list) and len(update_results) > 0:
-            # Count successful results in sequential response
-            for result_item in update_results:
-                if result_item and hasattr(result_item, 'status_code') and result_item.status_code == 200:
-                    successful_updates += 1
-                elif isinstance(result_item, dict) and 'result' in result_item:
-                    successful_updates += 1
-                elif isinstance(result_item, dict) and 'error' in result_item:
-                    failed_updates += 1
-                else:
-                    failed_updates += 1
+            logger.info(f"   - {key}: {value}")
+        
+        # Update all parts in a single batched tRPC call
+        update_results = self.update_parts_batch(part_updates)
+        
+        # Create summary - batched response is a list with one entry per part, in order
+        paired = isinstance(update_results, list) and len(update_results) == len(part_ids)
+        if isinstance(update_results, list) and not paired:
+            logger.error(f"❌ Batch returned {len(update_results)} results for {len(part_ids)} parts")
+        if paired:
+            successful_updates = sum(
+                1 for result_item in update_results
+                if isinstance(result_item, dict) and 'result' in result_item
+            )
+            failed_updates = len(part_ids) - successful_updates
         else:
-            failed_updates = len(all_parts)
+            # Non-200 response, request error or unpaired results: nothing in the batch is confirmed
+            successful_updates = 0
+            failed_updates = len(part_ids)
         
         summary = {
-            'total_parts': len(all_parts),
+            'total_parts': len(part_ids),
             'successful_updates': successful_updates,
             'failed_updates': failed_updates,
             'updates_applied': updates
         }
         
-        print(f"\n📊 Update Summary:")
-        print(f"   ✅ Successful: {successful_updates}")
-        print(f"   ❌ Failed: {failed_updates}")
-        print(f"   📦 Total parts: {len(all_parts)}")
+        logger.info("📊 Update Summary:")
+        logger.info(f"   ✅ Successful: {successful_updates}")
+        logger.info(f"   ❌ Failed: {failed_updates}")
+        logger.info(f"   📦 Total parts: {len(part_ids)}")
         
-        return {
-            'quote_details': quote_data,
+        result = {
             'part_updates': update_results,
             'summary': summary
         }
-    
+        if not paired:
+            result['error'] = "Batch update failed"
+        return result
     
     def get_quote_details(self, quote_id):
         """
@@ -280,7 +368,8 @@ class FabworksAPIClient:
             quote_id (str): The quote ID to retrieve
         
         Returns:
-            The API response
+            The API response. If the server sent an ETag last time and answers 304
+            Not Modified, the previously parsed details are returned again.
         """
         import urllib.parse
         
@@ -291,37 +380,54 @@ class FabworksAPIClient:
         url = f"{self.base_url}/quotes.detail?batch=1&input={encoded_input}"
         
         try:
-            print(f"🚀 Getting quote details: {quote_id}")
-            print(f"🎯 URL: {url}")
-            print(f"📦 Input data: {json.dumps(input_data, indent=2)}")
+            logger.info(f"🚀 Getting quote details: {quote_id}")
+            # Full request/response dumps only when debug logging is on
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug(f"🎯 URL: {url}")
+                logger.debug(f"📦 Input data: {json.dumps(input_data, indent=2)}")
+            
+            # Revalidate against the last copy so an unchanged quote comes back as an empty 304
+            cached = self._etag_cache.get(quote_id)
+            headers = {"If-None-Match": cached[0]} if cached else None
+            response = self.session.get(url, headers=headers)
             
-            response = self.session.get(url, headers=self.headers)
+            if response.status_code == 304 and cached:
+                logger.info("✅ Quote details unchanged (304), using cached copy")
+                return cached[1]
             
-            print(f"📊 Response Status: {response.status_code}")
+            # Read the body once; it is parsed once and only re-serialized for debug dumps
+            raw = response.content
+            logger.debug(f"📊 Response Status: {response.status_code} ({len(raw)} bytes)")
             
             try:
-                response_data = response.json()
-                print(f"📄 Response: {json.dumps(response_data, indent=2)}")
+                response_data = _json_loads(raw)
+                if debug:
+                    logger.debug(f"📄 Response: {json.dumps(response_data, indent=2)}")
                 
                 if response.status_code == 200:
-                    print("✅ Quote details retrieved successfully!")
+                    logger.info("✅ Quote details retrieved successfully!")
+                    etag = response.headers.get("ETag")
+                    if etag:
+                        self._etag_cache[quote_id] = (etag, response_data)
                     return response_data
                 else:
-                    print(f"❌ Failed to get quote details. Status: {response.status_code}")
+                    logger.error(f"❌ Failed to get quote details. Status: {response.status_code}")
                     
             except ValueError:
-                print(f"📄 Non-JSON Response: {response.text}")
+                logger.error(f"📄 Non-JSON Response: {response.text}")
             
             return response
             
         except requests.exceptions.RequestException as e:
-            print(f"❌ Request failed: {e}")
+            logger.error(f"❌ Request failed: {e}")
             return None
 
 def main():
     """
     Main function with example usage including batch updates
     """
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     print("🔧 Fabworks API Client - Batch Update Demo\n")
     
     # Initialize client
@@ -10,20 +10,70 @@ Usage:
 
 import json
 import os
+import queue
+import random
 import argparse
+import atexit
+import gzip
+import hashlib
+import itertools
+import logging
+import logging.handlers
 import sys
+import time
 import urllib3
+import zlib
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
 from fabworks_api_client import FabworksAPIClient
 
-# Disable SSL certificate verification warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+logger = logging.getLogger(__name__)
+
+# orjson is optional; it serializes the large quote responses much faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# gzip level for --compress; the outputs are near-duplicates, so higher levels gain little
+GZIP_LEVEL = 6
+
+# Quotes permuted at once unless --concurrency or PERMUTE_CONCURRENCY says otherwise;
+# kept low so a multi-quote run stays under the API's rate limit
+DEFAULT_CONCURRENCY = 4
+
+# Attempts per combination before it is skipped, and the base of the exponential backoff (seconds)
+COMBINATION_ATTEMPTS = 3
+RETRY_BACKOFF = 1.0
+
+# Per-run quote cache inside the output directory; hidden, so extract_pricing_data.py skips it
+CACHE_DIRNAME = '.quote_cache'
+
+# Aggregated output file for --aggregate, one JSON record per line
+RESULTS_FILENAME = 'results.jsonl'
+
+# Finished quotes allowed to wait for the background file writer
+MAX_PENDING_WRITES = 2
+
+# One material choice from materials.json; plain tuple underneath, so it hashes and unpacks like one
+MatKey = namedtuple('MatKey', 'type grade thickness')
+
+# Character substitutions that make material properties safe in filenames
+NAME_FILENAME_CHARS = str.maketrans({" ": "_", "/": "-"})
+GRADE_FILENAME_CHARS = str.maketrans({"-": "_", "/": "-"})
+THICKNESS_FILENAME_CHARS = str.maketrans({".": "p"})
 
 def load_materials_data(materials_file='data/materials.json'):
     """Load materials data from specified materials.json file"""
     try:
-        with open(materials_file, 'r') as f:
-            data = json.load(f)
+        if orjson is not None:
+            with open(materials_file, 'rb') as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(materials_file, 'r') as f:
+                data = json.load(f)
         return data[0]['result']['data']['json']
     except FileNotFoundError:
         print(f"❌ Error: Materials file not found: {materials_file}")
@@ -36,21 +86,99 @@ def load_materials_data(materials_file='data/materials.json'):
         print(f"❌ Error loading materials file: {e}")
         return None
 
+def write_json(filepath, data, pretty=False, compress=False):
+    """Write data as compact JSON (indented if pretty, gzipped if compress), straight to bytes with orjson when available"""
+    if orjson is not None:
+        with (gzip.open(filepath, 'wb', compresslevel=GZIP_LEVEL) if compress else open(filepath, 'wb')) as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else None))
+    else:
+        with (gzip.open(filepath, 'wt', compresslevel=GZIP_LEVEL, encoding='utf-8') if compress else open(filepath, 'w')) as f:
+            if pretty:
+                json.dump(data, f, indent=2)
+            else:
+                json.dump(data, f, separators=(',', ':'))
+
+def save_output(filepath, data, pretty=False, compress=False):
+    """write_json via a temp file, so an interrupted run never leaves a truncated result behind"""
+    write_json(filepath + '.tmp', data, pretty, compress)
+    os.replace(filepath + '.tmp', filepath)
+
+def append_record(results_file, record):
+    """Append record to an open binary JSON Lines file (plain or gzip) as one compact line"""
+    if orjson is not None:
+        line = orjson.dumps(record) + b'\n'
+    else:
+        line = json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'
+    results_file.write(line)
+    # Flushed per record so an interrupted run loses at most the line being written;
+    # on a gzip stream this is a sync flush, which keeps the compression going
+    results_file.flush()
+
+def read_recorded_filenames(results_path, trim=True):
+    """Filenames of the records in a results file, trimming a partial last line left by an interrupted run unless trim is False"""
+    if results_path.endswith('.gz'):
+        return read_compressed_recorded_filenames(results_path, trim)
+    recorded = set()
+    try:
+        with open(results_path, 'rb+' if trim else 'rb') as f:
+            complete_bytes = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                complete_bytes += len(line)
+                try:
+                    recorded.add(json.loads(line)['filename'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+            if trim:
+                f.truncate(complete_bytes)
+    except FileNotFoundError:
+        pass
+    return recorded
+
+def read_compressed_recorded_filenames(results_path, trim=True):
+    """read_recorded_filenames for a gzipped results file, rewritten without the truncated tail an interrupted run leaves"""
+    recorded = set()
+    if not os.path.exists(results_path):
+        return recorded
+    # Each record was sync-flushed, so everything before the cut decompresses intact
+    with ExitStack() as stack:
+        src = stack.enter_context(gzip.open(results_path, 'rb'))
+        dst = None
+        if trim:
+            dst = stack.enter_context(gzip.open(results_path + '.tmp', 'wb', compresslevel=GZIP_LEVEL))
+        try:
+            for line in src:
+                if not line.endswith(b'\n'):
+                    break
+                if dst is not None:
+                    dst.write(line)
+                try:
+                    recorded.add(json.loads(line)['filename'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            pass
+    if trim:
+        os.replace(results_path + '.tmp', results_path)
+    return recorded
+
+def wait_for_writes(pending_writes, keep=0):
+    """Wait until at most `keep` queued file writes are outstanding, reporting failures"""
+    while len(pending_writes) > keep:
+        filename, future = pending_writes.popleft()
+        try:
+            future.result()
+        except Exception as e:
+            logger.error(f"   ❌ Failed to write {filename}: {e}")
+
 def extract_material_combinations(materials_data):
-    """Extract all unique material combinations"""
-    combinations = []
-    
-    # Extract from materials array
-    for material in materials_data['materials']:
-        combination = {
-            'materialType': material['type'],
-            'materialGrade': material['grade'],
-            'materialThickness': material['thickness']
-        }
-        if combination not in combinations:
-            combinations.append(combination)
-    
-    return combinations
+    """Extract all unique MatKey(type, grade, thickness) material combinations, in file order"""
+    # dict.fromkeys keeps the first occurrence of each key with O(1) membership
+    return list(dict.fromkeys(
+        MatKey(material['type'], material['grade'], material['thickness'])
+        for material in materials_data['materials']
+    ))
 
 def extract_finish_options(materials_data):
     """Extract finish options - only first powder coat to reduce permutations"""
@@ -67,7 +195,8 @@ def extract_finish_options(materials_data):
             # Add all non-powder-coat finishes
             finishes.append(finish['name'])
     
-    return finishes
+    # Finishes listed twice would only repeat identical quote updates
+    return list(dict.fromkeys(finishes))
 
 def create_output_directory(quote_id, output_prefix=None):
     """Create output directory for results with quote_id and optional prefix"""
@@ -86,14 +215,79 @@ def create_output_directory(quote_id, output_prefix=None):
 
 def safe_filename(material_type, material_grade, thickness, finish):
     """Create a safe filename from material properties"""
-    # Replace problematic characters
-    safe_type = material_type.replace(" ", "_").replace("/", "-")
-    safe_grade = material_grade.replace("-", "_").replace("/", "-")
-    safe_thickness = thickness.replace(".", "p")
-    safe_finish = finish.replace(" ", "_").replace("/", "-")
+    # Replace problematic characters, one translate pass per field
+    safe_type = material_type.translate(NAME_FILENAME_CHARS)
+    safe_grade = material_grade.translate(GRADE_FILENAME_CHARS)
+    safe_thickness = thickness.translate(THICKNESS_FILENAME_CHARS)
+    safe_finish = finish.translate(NAME_FILENAME_CHARS)
     
     return f"{safe_type}_{safe_grade}_{safe_thickness}_{safe_finish}.json"
 
+def quote_from_update_result(result, updates):
+    """
+    Return quote details taken from a parts.update batch response, or None
+    
+    Only accepted if an entry carries the whole quote (assemblies and pricing) and
+    every part in it already shows the requested updates; the batched updates run
+    concurrently on the server, so an entry returned before the others landed must
+    not stand in for the final quote.
+    """
+    for entry in reversed(result.get('part_updates') or ()):
+        try:
+            quote_data = entry['result']['data']['json']
+            assemblies = quote_data['assemblies']
+        except (KeyError, TypeError):
+            continue
+        if 'pricing' not in quote_data:
+            continue
+        parts = [part for assembly in assemblies for part in assembly.get('parts', ())]
+        if parts and all(part.get(key) == value for part in parts for key, value in updates.items()):
+            # Same shape as a quotes.detail batch response
+            return [entry]
+    return None
+
+def quote_cache_key(quote_id, updates):
+    """Cache key for the quote state produced by applying updates to a quote"""
+    key_data = json.dumps({"q": quote_id, "u": updates}, sort_keys=True)
+    return hashlib.blake2b(key_data.encode()).hexdigest()
+
+def load_cached_quote(cache_dir, key):
+    """Return the cached quote details for key, or None on a miss"""
+    try:
+        if orjson is not None:
+            with open(os.path.join(cache_dir, f"{key}.json"), 'rb') as f:
+                return orjson.loads(f.read())
+        with open(os.path.join(cache_dir, f"{key}.json"), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def store_cached_quote(cache_dir, key, quote_details):
+    """Save quote details under key (cache_dir must exist); written to a temp file first so readers never see a partial entry"""
+    cache_path = os.path.join(cache_dir, f"{key}.json")
+    write_json(cache_path + '.tmp', quote_details)
+    os.replace(cache_path + '.tmp', cache_path)
+
+def setup_logging(verbose=False):
+    """
+    Log one line per combination, or every step with verbose
+    
+    Records go through a queue to a background thread that does the console
+    writes, so lanes never stall on stdout. Returns the queue; join() it to wait
+    until everything logged so far is printed. It is also flushed at exit.
+    """
+    log_queue = queue.Queue()
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    listener.start()
+    atexit.register(listener.stop)
+    logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[logging.handlers.QueueHandler(log_queue)])
+    
+    # Per-step detail from this script and the client's per-call progress only when verbose;
+    # the client's full request/response dumps stay at DEBUG
+    logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+    logging.getLogger(FabworksAPIClient.__module__).setLevel(logging.INFO if verbose else logging.WARNING)
+    return log_queue
+
 def parse_arguments():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(
@@ -104,13 +298,19 @@ Examples:
   %(prog)s --quote-id qte_333at6zprvFFBYez5eCTxVmFGYl
   %(prog)s -q qte_123456789 --output-prefix "test_batch"
   %(prog)s -q qte_987654321 --materials-file "samples/custom_materials.json"
+  %(prog)s -q qte_123456789 qte_987654321 --concurrency 2
+  %(prog)s -q qte_123456789 -q qte_987654321 -q qte_555555555
+  %(prog)s -q qte_123456789 --proxy http://10.86.98.56:8282 --insecure
+  %(prog)s -q qte_123456789 --resume "data/_quote_123456789_materials_20250101_120000"
         """
     )
     
     parser.add_argument(
         '--quote-id', '-q',
         required=True,
-        help='Quote ID to update (e.g., qte_333at6zprvFFBYez5eCTxVmFGYl)'
+        nargs='+',
+        action='extend',
+        help='Quote ID to update (e.g., qte_333at6zprvFFBYez5eCTxVmFGYl); repeat or list several to permute them side by side'
     )
     
     parser.add_argument(
@@ -125,13 +325,200 @@ Examples:
         help='Path to materials.json file (default: data/materials.json)'
     )
     
+    parser.add_argument(
+        '--resume',
+        metavar='DIR',
+        help='Write into an existing output directory and skip combinations whose file is already there'
+    )
+    
+    parser.add_argument(
+        '--concurrency', '-c',
+        type=int,
+        # argparse runs string defaults through type, so a bad value is a usage error
+        default=os.environ.get('PERMUTE_CONCURRENCY', str(DEFAULT_CONCURRENCY)),
+        help=f'Maximum number of quotes permuted at the same time (default: $PERMUTE_CONCURRENCY or {DEFAULT_CONCURRENCY})'
+    )
+    
+    parser.add_argument(
+        '--proxy',
+        metavar='URL',
+        help='Proxy for API requests (e.g., http://10.86.98.56:8282); defaults to the HTTPS_PROXY environment setting'
+    )
+    
+    parser.add_argument(
+        '--insecure', '-k',
+        action='store_true',
+        help='Skip SSL certificate verification (for TLS-intercepting proxies)'
+    )
+    
+    parser.add_argument(
+        '--aggregate',
+        action='store_true',
+        help=f'Append every result to one {RESULTS_FILENAME} (JSON Lines) in the output directory instead of one file each'
+    )
+    
+    parser.add_argument(
+        '--pretty',
+        action='store_true',
+        help='Indent the saved JSON files for reading (default: compact)'
+    )
+    
+    parser.add_argument(
+        '--compress',
+        action='store_true',
+        help=f'Gzip the saved JSON files (written as .json.gz), or stream {RESULTS_FILENAME}.gz with --aggregate'
+    )
+    
+    parser.add_argument(
+        '--verbose', '-v',
+        action='store_true',
+        help='Show every step of each combination and the API calls, not just one line per combination'
+    )
+    
     parser.add_argument(
         '--dry-run', '-d',
         action='store_true',
         help='Show what would be done without making API calls'
     )
     
-    return parser.parse_args()
+    args = parser.parse_args()
+    # The same quote twice would run two lanes against one quote at once
+    args.quote_id = list(dict.fromkeys(args.quote_id))
+    if args.resume and len(args.quote_id) > 1:
+        parser.error('--resume takes a single --quote-id')
+    if args.aggregate and args.pretty:
+        parser.error('--aggregate writes compact JSON Lines; drop --pretty')
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+    return args
+
+def fetch_combination_quote(client, quote_id, part_ids, updates, cache_dir):
+    """Apply updates to the quote and return its details (cached when possible), or None on failure"""
+    # Reuse the quote state saved by an earlier run of this combination
+    cache_key = quote_cache_key(quote_id, updates)
+    quote_details = load_cached_quote(cache_dir, cache_key)
+    if quote_details is not None:
+        logger.debug("   💾 Using cached quote details")
+        return quote_details
+    
+    # Update all parts in quote with this combination
+    logger.debug("   🔄 Updating quote...")
+    result = client.update_all_parts_by_ids(part_ids, updates)
+    if result.get('error'):
+        logger.warning(f"   ❌ Failed to update quote: {result['error']}")
+        return None
+    # Some parts kept their previous settings, so the quote does not price this combination
+    failed_updates = result['summary']['failed_updates']
+    if failed_updates:
+        logger.warning(f"   ❌ {failed_updates} of {len(part_ids)} part updates failed")
+        return None
+    
+    # The update response may already hold the repriced quote
+    quote_details = quote_from_update_result(result, updates)
+    if quote_details is not None:
+        logger.debug("   📋 Using quote details from the update response")
+    else:
+        # Get updated quote details
+        logger.debug("   📋 Getting updated quote details...")
+        quote_details = client.get_quote_details(quote_id)
+        # A failed call comes back as the raw response (or None), not a batch list
+        if not isinstance(quote_details, list) or not quote_details:
+            logger.warning("   ❌ Failed to get quote details")
+            return None
+    
+    store_cached_quote(cache_dir, cache_key, quote_details)
+    return quote_details
+
+def permute_quote(client, writer, quote_id, part_ids, combinations, filenames, output_dir, args, tag="", results_file=None):
+    """
+    Run combinations against one quote in order, queueing each result on writer
+    
+    Results go to one file each in output_dir, or are appended to results_file
+    (an open JSON Lines file) when given. Returns how many were processed.
+    """
+    # Serializing and saving happen on the writer thread so the next combination's
+    # API calls start right away; at most MAX_PENDING_WRITES results per lane wait in memory
+    pending_writes = deque()
+    # Quotes cached by this run (or the run being resumed) only
+    cache_dir = os.path.join(output_dir, CACHE_DIRNAME)
+    
+    total_combinations = len(combinations)
+    
+    # Loop through all combinations
+    for current_combination, combination in enumerate(combinations, start=1):
+        material_type, material_grade, thickness, finish = combination
+        
+        logger.debug(f"\n📝 {tag}Processing combination {current_combination}/{total_combinations}")
+        logger.debug(f"   Material: {material_type} {material_grade}")
+        logger.debug(f"   Thickness: {thickness}\"")
+        logger.debug(f"   Finish: {finish}")
+        
+        # Prepare update data
+        updates = {
+            'materialType': material_type,
+            'materialGrade': material_grade, 
+            'materialThickness': thickness,
+            'finish': finish
+        }
+        filename = filenames[combination]
+        
+        # Retrying is safe: the update only sets fields, so a repeat leaves the same quote
+        quote_details = None
+        for attempt in range(1, COMBINATION_ATTEMPTS + 1):
+            try:
+                quote_details = fetch_combination_quote(client, quote_id, part_ids, updates, cache_dir)
+            except Exception as e:
+                logger.warning(f"   ❌ {tag}Error processing {filename}: {e}")
+            if quote_details is not None or attempt == COMBINATION_ATTEMPTS:
+                break
+            # Back off past transient outages the client's own quick retries didn't ride out
+            delay = RETRY_BACKOFF * 2 ** (attempt - 1) + random.uniform(0, RETRY_BACKOFF)
+            logger.warning(f"   🔁 {tag}Retrying {filename} in {delay:.1f}s (attempt {attempt + 1}/{COMBINATION_ATTEMPTS})")
+            time.sleep(delay)
+        
+        if quote_details is not None:
+            filepath = os.path.join(output_dir, filename)
+            
+            # Prepare output data
+            output_data = {
+                'combination_info': {
+                    'materialType': material_type,
+                    'materialGrade': material_grade,
+                    'materialThickness': thickness,
+                    'finish': finish,
+                    'timestamp': datetime.now().isoformat()
+                },
+                # 'update_result': result,
+                'quote_details': quote_details
+            }
+            
+            # Save in the background, keeping the write queue bounded
+            wait_for_writes(pending_writes, keep=MAX_PENDING_WRITES - 1)
+            if results_file is not None:
+                # The filename identifies the record, as it does the file in per-file mode
+                write_task = writer.submit(append_record, results_file, {'filename': filename, **output_data})
+            else:
+                write_task = writer.submit(save_output, filepath, output_data, args.pretty, args.compress)
+            pending_writes.append((filename, write_task))
+            
+            # Extract pricing if available
+            price = ""
+            quote_data = quote_details[0].get('result', {}).get('data', {}).get('json')
+            if quote_data and 'pricing' in quote_data:
+                total_cents = quote_data['pricing'].get('total', {}).get('price', 0)
+                price = f" 💰 ${total_cents / 100:.2f}"
+            status = f"✅ {filename}{price}"
+        else:
+            status = f"❌ Gave up on {filename} after {COMBINATION_ATTEMPTS} attempts"
+        
+        # One line per combination, with its progress through this quote
+        progress = (current_combination / total_combinations) * 100
+        logger.info(f"{tag}[{current_combination}/{total_combinations} {progress:.1f}%] {status}")
+    
+    # Flush this lane's remaining file writes before reporting completion
+    wait_for_writes(pending_writes)
+    
+    return total_combinations
 
 def main():
     """
@@ -140,9 +527,11 @@ def main():
     # Parse command line arguments
     args = parse_arguments()
     
+    log_queue = setup_logging(args.verbose)
+    
     print("🚀 MATERIAL PERMUTATION SCRIPT")
     print("=" * 60)
-    print(f"📋 Quote ID: {args.quote_id}")
+    print(f"📋 Quote ID: {', '.join(args.quote_id)}")
     print(f"📂 Materials file: {args.materials_file}")
     if args.output_prefix:
         print(f"🏷️ Output prefix: {args.output_prefix}")
@@ -162,142 +551,139 @@ def main():
     material_combinations = extract_material_combinations(materials_data)
     finish_options = extract_finish_options(materials_data)
     
+    # Every distinct (type, grade, thickness, finish) quote state, each submitted once
+    combinations = [
+        (*material, finish)
+        for material, finish in itertools.product(material_combinations, finish_options)
+    ]
+    
     print(f"📊 Found {len(material_combinations)} material combinations")
     print(f"🎨 Found {len(finish_options)} finish options")
-    print(f"🔢 Total permutations: {len(material_combinations) * len(finish_options)}")
+    print(f"🔢 Total permutations: {len(combinations)}")
     
-    # Create output directory
-    output_dir = create_output_directory(args.quote_id, args.output_prefix)
-    print(f"📁 Output directory: {output_dir}")
+    # Create output directory, or continue filling the one from an interrupted run
+    quote_ids = args.quote_id
+    if args.resume:
+        os.makedirs(args.resume, exist_ok=True)
+        output_dirs = {quote_ids[0]: args.resume}
+    else:
+        output_dirs = {quote_id: create_output_directory(quote_id, args.output_prefix) for quote_id in quote_ids}
+    for quote_id, output_dir in output_dirs.items():
+        print(f"📁 Output directory for {quote_id}: {output_dir}")
     
     # Initialize API client (only if not dry run)
-    quote_id = args.quote_id
     client = None
     
     if not args.dry_run:
+        # Each run caches quotes inside its own output directory, so only --resume of
+        # that run reuses them; a new run always prices every combination afresh.
+        # Created once here rather than checked on every cache write
+        for output_dir in output_dirs.values():
+            os.makedirs(os.path.join(output_dir, CACHE_DIRNAME), exist_ok=True)
+        
         print("🔌 Initializing API client...")
-        # Configure proxy settings
-        proxy_config = {
-            # 'http': 'http://10.86.98.56:8282',
-            # 'https': 'http://10.86.98.56:8282'
-        }
-        client = FabworksAPIClient()
-        # Set proxy for the session
-        client.session.proxies.update(proxy_config)
-        # Disable SSL certificate verification
-        client.session.verify = False
-        print("🌐 Proxy configured: 10.86.98.56:8282")
-        print("🔒 SSL certificate verification disabled")
+        # One pooled connection per lane, so concurrent quotes never wait on a checkout
+        client = FabworksAPIClient(pool_maxsize=args.concurrency, proxy=args.proxy, verify=not args.insecure)
+        if args.proxy:
+            print(f"🌐 Proxy configured: {args.proxy}")
+        if args.insecure:
+            # Expected when the proxy intercepts TLS; don't warn on every request
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            print("🔒 SSL certificate verification disabled")
     else:
         print("🔍 DRY RUN: API client not initialized")
     
-    total_combinations = len(material_combinations) * len(finish_options)
-    current_combination = 0
+    # A quote's parts don't change between combinations, so read their IDs once per quote
+    part_ids = {}
+    if client is not None:
+        for quote_id in quote_ids:
+            print(f"🔍 Getting parts from quote: {quote_id}")
+            part_ids[quote_id] = client.get_quote_part_ids(quote_id)
+            if not part_ids[quote_id]:
+                print(f"❌ Failed to get parts from quote {quote_id}. Exiting.")
+                sys.exit(1)
+            print(f"📋 Found {len(part_ids[quote_id])} parts in quote")
     
-    print("\n" + "=" * 60)
-    print("🎯 Starting permutation process...")
-    print("=" * 60)
+    # Output filename per combination, computed once up front
+    extension = '.gz' if args.compress and not args.aggregate else ''
+    results_filename = RESULTS_FILENAME + ('.gz' if args.compress else '')
+    filenames = {combination: safe_filename(*combination) + extension for combination in combinations}
     
-    # Loop through all combinations
-    for material_combo in material_combinations:
-        for finish in finish_options:
-            current_combination += 1
-            
-            print(f"\n📝 Processing combination {current_combination}/{total_combinations}")
-            print(f"   Material: {material_combo['materialType']} {material_combo['materialGrade']}")
-            print(f"   Thickness: {material_combo['materialThickness']}\"")
-            print(f"   Finish: {finish}")
-            
-            # Prepare update data
-            updates = {
-                'materialType': material_combo['materialType'],
-                'materialGrade': material_combo['materialGrade'], 
-                'materialThickness': material_combo['materialThickness'],
-                'finish': finish
-            }
-            
-            try:
-                if args.dry_run:
-                    # Dry run mode - just show what would be done
-                    print("   🔍 DRY RUN: Would update quote with these settings")
-                    print(f"   🔍 DRY RUN: Would save to file")
-                    filename = safe_filename(
-                        material_combo['materialType'],
-                        material_combo['materialGrade'],
-                        material_combo['materialThickness'],
-                        finish
-                    )
-                    print(f"   🔍 DRY RUN: Filename would be: {filename}")
-                    continue
-                
-                # Update all parts in quote with this combination
-                print("   🔄 Updating quote...")
-                result = client.update_all_parts_in_quote(quote_id, updates)
-                
-                if result and not result.get('error'):
-                    # Get updated quote details
-                    print("   📋 Getting updated quote details...")
-                    quote_details = client.get_quote_details(quote_id)
-                    
-                    if quote_details:
-                        # Create filename
-                        filename = safe_filename(
-                            material_combo['materialType'],
-                            material_combo['materialGrade'],
-                            material_combo['materialThickness'],
-                            finish
-                        )
-                        filepath = os.path.join(output_dir, filename)
-                        
-                        # Prepare output data
-                        output_data = {
-                            'combination_info': {
-                                'materialType': material_combo['materialType'],
-                                'materialGrade': material_combo['materialGrade'],
-                                'materialThickness': material_combo['materialThickness'],
-                                'finish': finish,
-                                'timestamp': datetime.now().isoformat()
-                            },
-                            # 'update_result': result,
-                            'quote_details': quote_details
-                        }
-                        
-                        # Save to file
-                        with open(filepath, 'w') as f:
-                            json.dump(output_data, f, indent=2)
-                        
-                        print(f"   ✅ Saved to: {filename}")
-                        
-                        # Extract pricing if available
-                        if isinstance(quote_details, list) and len(quote_details) > 0:
-                            quote_data = quote_details[0].get('result', {}).get('data', {}).get('json')
-                            if quote_data and 'pricing' in quote_data:
-                                total_cents = quote_data['pricing'].get('total', {}).get('price', 0)
-                                total_dollars = total_cents / 100
-                                print(f"   💰 Quote total: ${total_dollars:.2f}")
+    # Combinations still to run for each quote; when resuming, list the output
+    # directory (or the aggregated results) once and drop combinations already saved
+    plans = {quote_id: combinations for quote_id in quote_ids}
+    if args.resume:
+        if args.aggregate:
+            # A dry run only reports, so it reads the file without trimming it
+            existing = read_recorded_filenames(os.path.join(args.resume, results_filename), trim=not args.dry_run)
+        else:
+            existing = set()
+            with os.scandir(args.resume) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    if entry.name.endswith('.tmp'):
+                        # Half-written result from a run killed mid-save; the combination is redone.
+                        # A dry run only reports, so it leaves the file for the real run to clear
+                        if not args.dry_run:
+                            os.remove(entry.path)
+                    elif entry.stat().st_size > 0:
+                        # Empty files are left over from older runs that died mid-write; redo those
+                        existing.add(entry.name)
+        remaining = [combination for combination in combinations if filenames[combination] not in existing]
+        print(f"⏭️ Resuming: {len(combinations) - len(remaining)} of {len(combinations)} combinations already saved")
+        plans[quote_ids[0]] = remaining
+    
+    total_combinations = sum(len(plan) for plan in plans.values())
+    processed = 0
+    
+    if not args.dry_run:
+        print("\n" + "=" * 60)
+        print("🎯 Starting permutation process...")
+        print("=" * 60)
+        
+        # Each quote is its own lane; lanes run side by side on the shared client
+        # while the combinations inside a lane stay strictly in order. All lanes
+        # hand their results to one writer thread so disk writes never overlap.
+        # Results files are closed last, after the lanes and the writer are done
+        tag = "[{}] " if len(quote_ids) > 1 else ""
+        with ExitStack() as results_files, \
+                ThreadPoolExecutor(max_workers=1) as writer, \
+                ThreadPoolExecutor(max_workers=min(args.concurrency, len(quote_ids))) as lanes:
+            lane_futures = []
+            for quote_id in quote_ids:
+                results_file = None
+                if args.aggregate:
+                    results_path = os.path.join(output_dirs[quote_id], results_filename)
+                    if args.compress:
+                        # One gzip stream across the whole run compresses the near-identical
+                        # records against each other; appends on resume add a new gzip member
+                        results_file = gzip.open(results_path, 'ab', compresslevel=GZIP_LEVEL)
                     else:
-                        print(f"   ❌ Failed to get quote details")
-                
-                else:
-                    print(f"   ❌ Failed to update quote: {result.get('error', 'Unknown error')}")
-                    
-            except Exception as e:
-                print(f"   ❌ Error processing combination: {e}")
-                continue
-            
-            # Progress indicator
-            progress = (current_combination / total_combinations) * 100
-            print(f"   📈 Progress: {progress:.1f}% ({current_combination}/{total_combinations})")
+                        results_file = open(results_path, 'ab')
+                    results_files.enter_context(results_file)
+                lane_futures.append(lanes.submit(
+                    permute_quote, client, writer, quote_id, part_ids[quote_id], plans[quote_id],
+                    filenames, output_dirs[quote_id], args, tag.format(quote_id), results_file
+                ))
+            processed = sum(future.result() for future in lane_futures)
+        
+        # Let the log thread print the last combinations before the summary
+        log_queue.join()
     
     print("\n" + "=" * 60)
     if args.dry_run:
         print("🎉 DRY RUN COMPLETE!")
-        print(f"🔍 Would have processed: {current_combination} combinations")
-        print(f"📁 Output directory would be: {output_dir}")
+        print(f"🔍 Would have processed: {total_combinations} combinations")
+        if combinations:
+            print(f"🔍 Filenames would range from {filenames[combinations[0]]} to {filenames[combinations[-1]]}")
+        for output_dir in output_dirs.values():
+            print(f"📁 Output directory would be: {output_dir}")
     else:
         print("🎉 PERMUTATION COMPLETE!")
-        print(f"📁 Results saved in: {output_dir}")
-        print(f"📊 Processed: {current_combination} combinations")
+        for output_dir in output_dirs.values():
+            print(f"📁 Results saved in: {output_dir}")
+        print(f"📊 Processed: {processed} combinations")
     print("=" * 60)
 
 if __name__ == "__main__":